@@ -7,8 +7,8 @@ import cv2
 import os
 import json
 import time
-from .detect import ViolationDetector
-from road_safety_violation_detector.website.paddle_ocr_reader import PaddleOCRReader, crop_from_bbox
+from website.detect import ViolationDetector
+from website.paddle_ocr_reader import PaddleOCRReader, crop_from_bbox
 
 
 def detect_violations(image_path, save_annotations=True):
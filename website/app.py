@@ -2,15 +2,13 @@
 Flask web application for Road Safety Violation Detector
 """
 
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, render_template, request, redirect, url_for, send_file, flash, Response, send_from_directory
-from db.models import DatabaseManager
+from website.database import DatabaseManager
 from configs.config import DATABASE_PATH, FLASK_HOST, FLASK_PORT, FLASK_DEBUG
-from road_safety_violation_detector.website.rules import compute_fine
-from road_safety_violation_detector.website.email_utils import send_payment_receipt
+from website.rules import compute_fine
+from website.email_utils import send_payment_receipt
 from datetime import datetime
 import time
 import qrcode
@@ -192,7 +190,7 @@ def download_pdf(violation_id):
         # Construct full path to PDF file
         from configs.config import REPORTS_STORAGE
         import os
-        pdf_file_path = os.path.join(REPORTS_STORAGE, violation['pdf_path'])
+        pdf_file_path = os.path.join(REPORTS_STORAGE, os.path.basename(violation['pdf_path']))
         
         if not os.path.exists(pdf_file_path):
             flash('PDF file not found on server', 'error')
@@ -423,7 +421,7 @@ def extract_demo_amount(transaction_id, expected_amount):
 def telangana_police_dashboard():
     """Dashboard showing recent Telangana Police e-Challans"""
     try:
-        from road_safety_violation_detector.website.telangana_police import get_recent_challans
+        from website.telangana_police import get_recent_challans
         recent_challans = get_recent_challans(30)  # Last 30 days
         return render_template('telangana_police.html', challans=recent_challans)
     except Exception as e:
@@ -434,7 +432,7 @@ def telangana_police_dashboard():
 def telangana_challan_details(challan_number):
     """Show details for a specific Telangana Police e-Challan"""
     try:
-        from road_safety_violation_detector.website.telangana_police import get_challan_details
+        from website.telangana_police import get_challan_details
         challan = get_challan_details(challan_number)
         if not challan:
             flash('Telangana Police challan not found', 'error')
@@ -456,7 +454,7 @@ def search_telangana_challans():
         return redirect(url_for('index'))
     
     try:
-        from road_safety_violation_detector.website.telangana_police import get_vehicle_challans, get_challan_details
+        from website.telangana_police import get_vehicle_challans, get_challan_details
         
         if search_type == 'vehicle':
             challans = get_vehicle_challans(search_value)
@@ -495,7 +493,7 @@ def api_stats():
     
     # Add Telangana Police statistics (separate system)
     try:
-        from road_safety_violation_detector.website.telangana_police import get_recent_challans
+        from website.telangana_police import get_recent_challans
         telangana_recent = get_recent_challans(30)
         telangana_count = len(telangana_recent)
         telangana_fines = sum(ch.get('fine_amount', 0) for ch in telangana_recent)
@@ -594,7 +592,7 @@ def demo_detection():
 def process_demo_image(image_path, location, violation_datetime):
     """Process uploaded image with advanced AI detection and evidence generation"""
     try:
-        from road_safety_violation_detector.website.ai_detector import detect_violations, save_detection_evidence
+        from website.ai_detector import detect_violations, save_detection_evidence
         import cv2
         
         # Read image
@@ -682,7 +680,7 @@ def process_demo_image(image_path, location, violation_datetime):
 def process_demo_video(video_path, location, violation_datetime):
     """Process uploaded video with frame-by-frame violation detection"""
     try:
-        from road_safety_violation_detector.website.video_processor import process_video_file
+        from website.video_processor import process_video_file
         
         # Create output directory for violation frames
         output_dir = os.path.join(app.root_path, '..', 'media', 'video_violations', 
@@ -802,7 +800,7 @@ def simulate_demo_detection(image_path, location, violation_datetime):
 def create_demo_violation(detection_result):
     """Create a violation record with enhanced PDF and evidence"""
     try:
-        from road_safety_violation_detector.website.enhanced_pdf import generate_enhanced_pdf
+        from website.enhanced_pdf import generate_enhanced_pdf
         import json
         
         # Calculate total fine based on violations
@@ -911,6 +909,10 @@ if __name__ == '__main__':
     # Ensure storage directories exist
     os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
     
+    # Keep e-challan lookups across restarts
+    from website.telangana_police import persist_cache
+    persist_cache(os.path.join(os.path.dirname(DATABASE_PATH), 'telangana_challan_cache.json'))
+    
     print(f"Starting Flask app on {FLASK_HOST}:{FLASK_PORT}")
     print(f"Database path: {DATABASE_PATH}")
     
@@ -0,0 +1,94 @@
+"""
+Database layer for Road Safety Violation Detector
+
+Extends db.models.DatabaseManager with the website's schema setup and keeps
+the fine-calculation count cache in step with violation inserts.
+"""
+
+import threading
+
+from db.models import DatabaseManager as _BaseDatabaseManager
+from website.rules import invalidate_violation_count
+
+# insert_violation's keyword arguments, in column order; insert_violations_bulk
+# writes the same columns
+VIOLATION_COLUMNS = (
+    'vehicle_no', 'violation_type', 'fine_amount', 'image_path', 'pdf_path',
+    'description', 'location_text', 'latitude', 'longitude'
+)
+
+# Database paths whose schema was already set up in this process
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+class DatabaseManager(_BaseDatabaseManager):
+    """DatabaseManager with the website's indexes and count-cache invalidation"""
+    
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.db_path = db_path
+        with _schema_lock:
+            if db_path not in _schema_ready:
+                self._create_indexes()
+                _schema_ready.add(db_path)
+    
+    def _create_indexes(self):
+        """
+        Create the index that backs per-vehicle violation counts (idempotent)
+        
+        Without it, count_previous_violations is a full scan of the violations table.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_violations_vehicle ON violations(vehicle_no)')
+        conn.commit()
+        conn.close()
+    
+    def insert_violation(self, vehicle_no, *args, **kwargs):
+        """
+        Insert a violation and drop the vehicle's cached previous-violation count
+        
+        Every insert goes through here, so compute_fine never prices a fine
+        off a count that misses a violation inserted by this process.
+        """
+        violation_id = super().insert_violation(vehicle_no, *args, **kwargs)
+        invalidate_violation_count(vehicle_no)
+        return violation_id
+    
+    def insert_violations_bulk(self, rows):
+        """
+        Insert several violations in one transaction, so they share a single commit
+        
+        Args:
+            rows (list): Dicts of insert_violation keyword arguments; columns
+                a row leaves out are inserted as NULL
+        
+        Returns:
+            list: New violation IDs, in row order
+        """
+        if not rows:
+            return []
+        columns = [column for column in VIOLATION_COLUMNS if any(column in row for row in rows)]
+        sql = 'INSERT INTO violations ({}) VALUES ({})'.format(
+            ', '.join(columns), ', '.join(f':{column}' for column in columns)
+        )
+        params = [{column: row.get(column) for column in columns} for row in rows]
+        
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            # The write lock is held until COMMIT, so no other writer can take
+            # rowids in between and this batch's IDs are consecutive
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.executemany(sql, params)
+            last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        for row in rows:
+            invalidate_violation_count(row['vehicle_no'])
+        return list(range(last_id - len(rows) + 1, last_id + 1))
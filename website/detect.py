@@ -4,23 +4,21 @@ Uses YOLOv8 with spatial reasoning for helmet and vehicle violations
 Integrated from Capstone project for superior accuracy
 """
 
-import sys
 import os
 import cv2
 import numpy as np
 import time
 from typing import Dict, List, Tuple, Any
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
 from configs.config import MODEL_PATH, CONFIDENCE_THRESHOLD
-from road_safety_violation_detector.website.spatial_logic import (
+from website.spatial_logic import (
+    BBoxArray,
     assign_riders_to_bike, 
     has_helmet_for_person, 
     count_riders_on_bike,
     bbox_center
 )
-from road_safety_violation_detector.website.plate_reader import PlateReader
+from website.plate_reader import get_plate_reader
 
 # Class names mapping
 CLASS_PERSON = "person"
@@ -30,14 +28,99 @@ CLASS_PLATE = "license_plate"
 
 BBox = Tuple[int, int, int, int]
 
+# Inference settings shared by single-frame and batched detection
+YOLO_PREDICT_ARGS = {'imgsz': 960, 'conf': 0.25, 'iou': 0.5, 'verbose': False}
+
+# Largest batch an exported TensorRT engine accepts (matches video detection batches)
+ENGINE_MAX_BATCH = 16
+
+# Model stride; letterboxed inputs are padded to a multiple of it
+MODEL_STRIDE = 32
+
+
+# Sliding-window tiling for high-resolution frames: (tile height, tile width, overlap)
+DEFAULT_TILE = (640, 640, 64)
+
+# JPEG quality for annotate='jpeg' results
+ANNOTATED_JPEG_QUALITY = 85
+
+
+def _annotation_outputs(annotated, annotate) -> Dict[str, Any]:
+    """Result entries for the annotated frame in the requested annotate mode"""
+    if annotate == 'jpeg':
+        ok, buf = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, ANNOTATED_JPEG_QUALITY])
+        return {"annotated_image": None, "annotated_jpeg": buf.tobytes() if ok else None}
+    return {"annotated_image": annotated if annotate else None}
+
+
+def _tile_origins(length: int, tile: int, overlap: int) -> List[int]:
+    """Start offsets of overlapping tiles covering [0, length); the last tile is edge-aligned"""
+    if length <= tile:
+        return [0]
+    origins = list(range(0, length - tile, tile - overlap))
+    origins.append(length - tile)
+    return origins
+
+
+def _class_aware_nms(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, iou: float) -> List[int]:
+    """Indices of boxes kept by per-class NMS"""
+    # Shift each class into its own coordinate range so boxes of different classes never overlap
+    offset = (cls * (xyxy.max() + 1))[:, None]
+    shifted = xyxy + offset
+    xywh = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), conf.tolist(), 0.0, iou)
+    return np.asarray(keep, dtype=np.int64).reshape(-1).tolist()
+
+
+class _MergedBox:
+    """One merged tile detection, indexed like a row of ultralytics Boxes"""
+    __slots__ = ('xyxy', 'conf', 'cls')
+    
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy[None]
+        self.conf = np.array([conf])
+        self.cls = np.array([cls])
+
+
+class _MergedResult:
+    """Tile detections merged into full-frame coordinates (the Results fields we use)"""
+    
+    def __init__(self, names, boxes):
+        self.names = names
+        self.boxes = boxes
+
+
+def _letterbox_shape(height: int, width: int, imgsz: int, stride: int = MODEL_STRIDE) -> Tuple[int, int]:
+    """Model input (height, width) for a frame scaled to imgsz on its long side, padded to stride"""
+    r = imgsz / max(height, width)
+    return tuple(-(-round(side * r) // stride) * stride for side in (height, width))
+
 
 class ViolationDetector:
     """Advanced violation detector with spatial reasoning"""
     
-    def __init__(self):
+    def __init__(self, quantize=False, calibration_data=None):
+        """
+        Initialize the detector
+        
+        Args:
+            quantize (bool): Run an INT8 TensorRT engine instead of the PyTorch weights
+                (FP16 inference if no engine can be used)
+            calibration_data (str): Dataset YAML of representative frames (e.g. ~500 frames
+                sampled at frame_skip from the sample videos) for building the INT8 engine
+        """
         self.model = None
+        self.model_path = None
         self.confidence_threshold = CONFIDENCE_THRESHOLD
-        self.plate_reader = PlateReader()
+        self.predict_args = dict(YOLO_PREDICT_ARGS)
+        self.quantize = quantize
+        self.calibration_data = calibration_data
+        # Model and per-input-shape models for specialize()
+        self._general_model = None
+        self._specialized = {}
+        self._input_shape = None
+        self._static_batch = False
+        self.plate_reader = get_plate_reader()
         self.load_model()
     
     def load_model(self):
@@ -53,6 +136,7 @@ class ViolationDetector:
             # 1. Try custom Indonesian traffic model first (BEST)
             if os.path.exists(custom_model_path):
                 self.model = YOLO(custom_model_path)
+                self.model_path = custom_model_path
                 self.model_type = "custom_indonesian"
                 print(f"✨ Loaded CUSTOM Indonesian model from {custom_model_path}")
                 print(f"   Trained on 2,028 Indonesian traffic violation images")
@@ -60,303 +144,515 @@ class ViolationDetector:
             # 2. Try YOLOv8m (medium) for better accuracy
             elif os.path.exists(model_m_path):
                 self.model = YOLO(model_m_path)
+                self.model_path = model_m_path
                 self.model_type = "yolov8m"
                 print(f"Loaded YOLOv8m (Medium) model from {model_m_path} - Better accuracy!")
             # 3. Fallback to YOLOv8n (nano)
             elif os.path.exists(MODEL_PATH):
                 self.model = YOLO(MODEL_PATH)
+                self.model_path = MODEL_PATH
                 self.model_type = "yolov8n"
                 print(f"Loaded YOLOv8n (Nano) model from {MODEL_PATH}")
             else:
                 print(f"Model file not found at {MODEL_PATH}, {model_m_path}, or {custom_model_path}")
                 self.model = None
                 self.model_type = "none"
+            
+            if self.model is not None and self.quantize:
+                self._use_int8_engine()
+            self._general_model = self.model
+            self._specialized = {}
+            self._input_shape = None
+            self._static_batch = False
         except ImportError:
             print("ultralytics not available. Using fallback detection")
             self.model = None
             self.model_type = "none"
     
-    def detect_violations(self, frame):
+    def _use_int8_engine(self):
+        """Switch to the INT8 TensorRT engine for the loaded weights, building it if needed"""
+        engine_path = os.path.splitext(self.model_path)[0] + '_int8.engine'
+        try:
+            self.model = self._load_int8_engine(engine_path, self.predict_args['imgsz'])
+            print(f"⚡ Using INT8 TensorRT engine {engine_path}")
+        except Exception as e:
+            # No TensorRT or no INT8 support on this GPU: half precision still helps
+            print(f"INT8 engine unavailable ({e}), using FP16 inference")
+            self.predict_args['half'] = True
+    
+    def _load_int8_engine(self, engine_path, imgsz, static=False):
+        """
+        Load an INT8 TensorRT engine, exporting it from the weights first if it is not on disk
+        
+        A static engine has its input fixed to imgsz and a batch of exactly
+        ENGINE_MAX_BATCH; otherwise batch and input size are dynamic.
+        """
+        from ultralytics import YOLO
+        
+        if not os.path.exists(engine_path):
+            if not self.calibration_data:
+                raise FileNotFoundError(f"{engine_path} not found and no calibration data given")
+            print(f"Building INT8 TensorRT engine, calibrating on {self.calibration_data}...")
+            exported = YOLO(self.model_path).export(
+                format='engine', int8=True, data=self.calibration_data,
+                imgsz=imgsz, batch=ENGINE_MAX_BATCH, dynamic=not static
+            )
+            os.replace(exported, engine_path)
+        return YOLO(engine_path, task='detect')
+    
+    def specialize(self, input_shape=None, letterbox=True):
+        """
+        Fix inference to inputs of one size, e.g. for the length of a video
+        
+        The model input becomes the frame's letterboxed shape instead of a square
+        imgsz. With quantize, a static TensorRT engine built for exactly that shape
+        and a batch of ENGINE_MAX_BATCH is loaded, or built once and cached on disk
+        as <weights>_int8_<H>x<W>_b<batch>.engine. Models are kept per shape, so
+        later videos of the same resolution switch back without reloading.
+        
+        Args:
+            input_shape (tuple): Input (height, width); None (or an unknown size)
+                restores general inference
+            letterbox (bool): Scale input_shape to imgsz first; pass False for
+                inputs that are already model-sized, such as tiles
+        """
+        if self._general_model is None:
+            return
+        if input_shape is None or min(input_shape) <= 0:
+            self._use_general_model()
+            return
+        
+        if letterbox:
+            shape = _letterbox_shape(*input_shape, YOLO_PREDICT_ARGS['imgsz'])
+        else:
+            shape = tuple(input_shape)
+        if shape not in self._specialized:
+            model = self._general_model
+            if self.quantize:
+                stem = os.path.splitext(self.model_path)[0]
+                engine_path = f"{stem}_int8_{shape[0]}x{shape[1]}_b{ENGINE_MAX_BATCH}.engine"
+                try:
+                    model = self._load_int8_engine(engine_path, list(shape), static=True)
+                    print(f"⚡ Using INT8 TensorRT engine {engine_path}")
+                except Exception as e:
+                    # The general engine only accepts its own square input size
+                    print(f"Shape-specialized engine unavailable ({e}), using the general model")
+                    model = None
+            self._specialized[shape] = model
+        
+        model = self._specialized[shape]
+        if model is None:
+            self._use_general_model()
+        else:
+            self.model = model
+            self.predict_args['imgsz'] = list(shape)
+            self._input_shape = shape
+            self._static_batch = model is not self._general_model
+    
+    def _use_general_model(self):
+        """Undo specialize()"""
+        self.model = self._general_model
+        self.predict_args['imgsz'] = YOLO_PREDICT_ARGS['imgsz']
+        self._input_shape = None
+        self._static_batch = False
+    
+    def _predict(self, images, **overrides):
+        """
+        Run the model on a list of images
+        
+        A shape-specialized engine only accepts batches of exactly ENGINE_MAX_BATCH,
+        so images then go in chunks of that size, the last one padded by repeating
+        its final image (results for the padding are dropped).
+        """
+        args = {**self.predict_args, **overrides}
+        if not self._static_batch:
+            return self.model.predict(images, **args)
+        results = []
+        for start in range(0, len(images), ENGINE_MAX_BATCH):
+            chunk = images[start:start + ENGINE_MAX_BATCH]
+            padded = chunk + [chunk[-1]] * (ENGINE_MAX_BATCH - len(chunk))
+            results.extend(self.model.predict(padded, **args)[:len(chunk)])
+        return results
+    
+    def detect_violations(self, frame, annotate=True, tile=None):
         """
         Detect violations using advanced spatial reasoning
         
         Args:
             frame (numpy.ndarray): Input image frame
+            annotate (bool or str): True returns the annotated frame as 'annotated_image';
+                'jpeg' returns it JPEG-encoded as 'annotated_jpeg' bytes instead;
+                False skips annotation
+            tile (tuple): (height, width, overlap) to detect on overlapping tiles batched
+                into one call, for frames much larger than the model input size
             
         Returns:
             dict: Detection results with violations and metadata
         """
         if self.model is not None:
-            return self._yolo_advanced_detection(frame)
+            return self._yolo_advanced_detection(frame, annotate, tile)
         else:
-            return self._fallback_detection(frame)
+            return self._fallback_detection(frame, annotate)
     
-    def _yolo_advanced_detection(self, frame):
+    def _yolo_advanced_detection(self, frame, annotate=True, tile=None, keep_raw=True):
         """
         Advanced YOLOv8 detection with spatial reasoning for violations
         Based on Capstone's superior detection logic
         """
         try:
             # Run YOLO inference with optimized parameters
-            results = self.model.predict(frame, imgsz=960, conf=0.25, iou=0.5, verbose=False)[0]
-            
-            # Organize detections by class
-            bboxes: Dict[str, List[BBox]] = {
-                CLASS_PERSON: [],
-                CLASS_BIKE: [],
-                CLASS_HELMET: [],
-                CLASS_PLATE: []
-            }
-            scores: Dict[str, List[float]] = {
-                CLASS_PERSON: [],
-                CLASS_BIKE: [],
-                CLASS_HELMET: [],
-                CLASS_PLATE: []
-            }
-            
-            names = results.names
-            
-            # Track direct violations from custom Indonesian model
-            direct_violations = []
-            
-            # Extract bounding boxes by class
-            for box in results.boxes:
-                cls_id = int(box.cls[0])
-                cls_name = names.get(cls_id, str(cls_id)).lower()
-                xyxy = box.xyxy[0].tolist()
-                conf = float(box.conf[0])
-                
-                # Convert to bbox format
-                bbox = self._to_bbox(xyxy)
-                
-                # Handle Indonesian custom model classes
-                if self.model_type == "custom_indonesian":
-                    # Indonesian class name mapping
-                    if cls_name in ("pengendara",):  # Rider
-                        bboxes[CLASS_PERSON].append(bbox)
-                        scores[CLASS_PERSON].append(conf)
-                    elif cls_name in ("helm",):  # Helmet
-                        bboxes[CLASS_HELMET].append(bbox)
-                        scores[CLASS_HELMET].append(conf)
-                    elif cls_name in ("platnomor",):  # License Plate
-                        bboxes[CLASS_PLATE].append(bbox)
-                        scores[CLASS_PLATE].append(conf)
-                    elif cls_name in ("tanpahelm",):  # Without Helmet - DIRECT VIOLATION!
-                        # Treat as person without helmet
-                        bboxes[CLASS_PERSON].append(bbox)
-                        scores[CLASS_PERSON].append(conf)
-                        # Record as direct violation
-                        direct_violations.append({
-                            "type": "helmet_violation",
-                            "bbox": bbox,
-                            "confidence": conf,
-                            "detected_directly": True
-                        })
-                else:
-                    # Standard COCO model class names
-                    if cls_name in ("person",):
-                        bboxes[CLASS_PERSON].append(bbox)
-                        scores[CLASS_PERSON].append(conf)
-                    elif cls_name in ("motorbike", "motorcycle", "bike"):
-                        bboxes[CLASS_BIKE].append(bbox)
-                        scores[CLASS_BIKE].append(conf)
-                    elif cls_name in ("helmet",):
-                        bboxes[CLASS_HELMET].append(bbox)
-                        scores[CLASS_HELMET].append(conf)
-                    elif cls_name in ("license_plate", "number_plate", "plate"):
-                        bboxes[CLASS_PLATE].append(bbox)
-                        scores[CLASS_PLATE].append(conf)
+            if tile:
+                results = self._predict_tiled(frame, tile)
+            else:
+                results = self._predict([frame])[0]
+            return self._build_detection_result(frame, results, annotate, keep_raw)
             
-            # Extract lists
-            persons = bboxes[CLASS_PERSON]
-            bikes = bboxes[CLASS_BIKE]
-            helmets = bboxes[CLASS_HELMET]
-            plates = bboxes[CLASS_PLATE]
+        except Exception as e:
+            print(f"Error in YOLO detection: {e}")
+            import traceback
+            traceback.print_exc()
+            return self._fallback_detection(frame, annotate)
+    
+    def detect_violations_batch(self, frames: List[np.ndarray], annotate=True, tile=None) -> List[Dict[str, Any]]:
+        """
+        Detect violations in several frames with one batched model call
+        
+        Args:
+            frames (list): Input image frames
+            annotate (bool or str): Annotation mode, as for detect_violations
+            tile (tuple): Tiling, as for detect_violations (each frame's tiles form one batch)
             
-            # Detect violations using spatial reasoning
-            violations = []
+        Returns:
+            list: Detection results for each frame, in input order. 'raw_result' is
+                None: YOLO results keep a reference to their input frame (orig_img),
+                and batch callers decode into reused buffers
+        """
+        if self.model is None or not frames:
+            return [self._fallback_detection(frame, annotate) for frame in frames]
+        if tile:
+            return [self._yolo_advanced_detection(frame, annotate, tile, keep_raw=False) for frame in frames]
+        
+        try:
+            batch_results = self._predict(frames)
+        except Exception as e:
+            print(f"Error in batched YOLO detection, detecting frames one by one: {e}")
+            return [self._yolo_advanced_detection(frame, annotate, keep_raw=False) for frame in frames]
+        
+        detections = []
+        for frame, results in zip(frames, batch_results):
+            try:
+                detections.append(self._build_detection_result(frame, results, annotate, keep_raw=False))
+            except Exception as e:
+                print(f"Error in YOLO detection: {e}")
+                detections.append(self._fallback_detection(frame, annotate))
+        return detections
+    
+    def _predict_tiled(self, frame, tile):
+        """Run one batched inference over overlapping tiles and merge boxes back to frame coordinates"""
+        tile_h, tile_w, overlap = tile
+        h, w = frame.shape[:2]
+        origins = [
+            (x, y)
+            for y in _tile_origins(h, tile_h, overlap)
+            for x in _tile_origins(w, tile_w, overlap)
+        ]
+        crops = [frame[y:y + tile_h, x:x + tile_w] for x, y in origins]
+        if self._input_shape == (tile_h, tile_w):
+            # specialize() already set the input size (and engine) for these tiles
+            tile_results = self._predict(crops)
+        else:
+            tile_results = self._predict(crops, imgsz=max(tile_h, tile_w))
+        
+        xyxy, conf, cls = [], [], []
+        for (x, y), results in zip(origins, tile_results):
+            boxes = results.boxes
+            if len(boxes) == 0:
+                continue
+            xyxy.append(boxes.xyxy.cpu().numpy() + np.array([x, y, x, y], dtype=np.float32))
+            conf.append(boxes.conf.cpu().numpy())
+            cls.append(boxes.cls.cpu().numpy())
+        
+        names = tile_results[0].names
+        if not xyxy:
+            return _MergedResult(names, [])
+        xyxy = np.concatenate(xyxy)
+        conf = np.concatenate(conf)
+        cls = np.concatenate(cls)
+        
+        # Objects on tile borders are detected in several tiles; keep the best box for each
+        keep = _class_aware_nms(xyxy, conf, cls, self.predict_args['iou'])
+        return _MergedResult(names, [_MergedBox(xyxy[i], conf[i], cls[i]) for i in keep])
+    
+    def _build_detection_result(self, frame, results, annotate=True, keep_raw=True):
+        """
+        Apply spatial reasoning and annotation to one frame's YOLO results
+        
+        keep_raw=False leaves 'raw_result' as None, so the result does not hold
+        on to the frame through results.orig_img.
+        """
+        # Organize detections by class
+        bboxes: Dict[str, List[BBox]] = {
+            CLASS_PERSON: [],
+            CLASS_BIKE: [],
+            CLASS_HELMET: [],
+            CLASS_PLATE: []
+        }
+        scores: Dict[str, List[float]] = {
+            CLASS_PERSON: [],
+            CLASS_BIKE: [],
+            CLASS_HELMET: [],
+            CLASS_PLATE: []
+        }
+        
+        names = results.names
+        
+        # Track direct violations from custom Indonesian model
+        direct_violations = []
+        
+        # Extract bounding boxes by class
+        for box in results.boxes:
+            cls_id = int(box.cls[0])
+            cls_name = names.get(cls_id, str(cls_id)).lower()
+            xyxy = box.xyxy[0].tolist()
+            conf = float(box.conf[0])
             
-            # Add direct violations from custom Indonesian model
-            if self.model_type == "custom_indonesian" and direct_violations:
-                violations.extend(direct_violations)
-                print(f"✨ Custom model detected {len(direct_violations)} direct violations (TanpaHelm)!")
+            # Convert to bbox format
+            bbox = self._to_bbox(xyxy)
             
-            # Continue with spatial reasoning for additional violations
-            for bike_bbox in bikes:
-                # Assign riders to this bike using spatial logic
-                riders = assign_riders_to_bike(bike_bbox, persons)
-                rider_count = len(riders)
-                
-                # Check triple riding
-                if rider_count >= 3:
-                    violations.append({
-                        "type": "triple_riding",
-                        "bike_bbox": bike_bbox,
-                        "riders": rider_count,
-                        "confidence": 0.90
+            # Handle Indonesian custom model classes
+            if self.model_type == "custom_indonesian":
+                # Indonesian class name mapping
+                if cls_name in ("pengendara",):  # Rider
+                    bboxes[CLASS_PERSON].append(bbox)
+                    scores[CLASS_PERSON].append(conf)
+                elif cls_name in ("helm",):  # Helmet
+                    bboxes[CLASS_HELMET].append(bbox)
+                    scores[CLASS_HELMET].append(conf)
+                elif cls_name in ("platnomor",):  # License Plate
+                    bboxes[CLASS_PLATE].append(bbox)
+                    scores[CLASS_PLATE].append(conf)
+                elif cls_name in ("tanpahelm",):  # Without Helmet - DIRECT VIOLATION!
+                    # Treat as person without helmet
+                    bboxes[CLASS_PERSON].append(bbox)
+                    scores[CLASS_PERSON].append(conf)
+                    # Record as direct violation
+                    direct_violations.append({
+                        "type": "helmet_violation",
+                        "bbox": bbox,
+                        "confidence": conf,
+                        "detected_directly": True
                     })
-                
-                # Check helmet violations for each rider (skip if already detected directly)
-                if self.model_type != "custom_indonesian":  # Only do spatial check for non-custom models
-                    for rider_bbox in riders:
-                        if not has_helmet_for_person(rider_bbox, helmets):
-                            violations.append({
-                                "type": "helmet_violation",
-                                "rider_bbox": rider_bbox,
-                                "bike_bbox": bike_bbox,
-                                "confidence": 0.85
-                            })
-            
-            # Generate custom color-coded annotated image
-            annotated = frame.copy()
-            
-            # Create violation lookup for detailed labeling
-            violation_map = {}  # bbox -> list of violations
-            for v in violations:
-                if 'rider_bbox' in v:
-                    if v['rider_bbox'] not in violation_map:
-                        violation_map[v['rider_bbox']] = []
-                    violation_map[v['rider_bbox']].append(v)
-                if 'bike_bbox' in v:
-                    if v['bike_bbox'] not in violation_map:
-                        violation_map[v['bike_bbox']] = []
-                    violation_map[v['bike_bbox']].append(v)
-                if 'bbox' in v:  # For direct TanpaHelm detections
-                    if v['bbox'] not in violation_map:
-                        violation_map[v['bbox']] = []
-                    violation_map[v['bbox']].append(v)
-            
-            # Draw bounding boxes with color coding and detailed labels
-            # 1. Draw bikes (green if compliant, red if violation)
-            for bike_bbox in bikes:
-                is_violation = bike_bbox in violation_map
-                color = (0, 0, 255) if is_violation else (0, 255, 0)  # Red or Green
-                x1, y1, x2, y2 = bike_bbox
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 3)
-                
-                if is_violation:
-                    # Show violation-specific labels with confidence
-                    violations_here = violation_map[bike_bbox]
-                    y_label = y1 - 10
-                    for v in violations_here:
-                        vtype = v['type'].replace('_', ' ').title()
-                        conf = v.get('confidence', 0.0) * 100
-                        label = f"{vtype} {conf:.0f}%"
-                        cv2.putText(annotated, label, (x1, y_label), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                        y_label -= 20
-                else:
-                    cv2.putText(annotated, 'Compliant Vehicle', (x1, y1-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-            
-            # 2. Draw persons/riders (red if violation, green if compliant)
-            for person_bbox in persons:
-                is_violation = person_bbox in violation_map
-                color = (0, 0, 255) if is_violation else (0, 255, 0)  # Red or Green
-                x1, y1, x2, y2 = person_bbox
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 3)
-                
-                if is_violation:
-                    # Show violation-specific labels with confidence
-                    violations_here = violation_map[person_bbox]
-                    y_label = y1 - 10
-                    for v in violations_here:
-                        vtype = v['type'].replace('_', ' ').title()
-                        conf = v.get('confidence', 0.0) * 100
-                        label = f"{vtype} {conf:.0f}%"
-                        cv2.putText(annotated, label, (x1, y_label), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                        y_label -= 20
-                else:
-                    cv2.putText(annotated, 'Compliant Rider', (x1, y1-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            else:
+                # Standard COCO model class names
+                if cls_name in ("person",):
+                    bboxes[CLASS_PERSON].append(bbox)
+                    scores[CLASS_PERSON].append(conf)
+                elif cls_name in ("motorbike", "motorcycle", "bike"):
+                    bboxes[CLASS_BIKE].append(bbox)
+                    scores[CLASS_BIKE].append(conf)
+                elif cls_name in ("helmet",):
+                    bboxes[CLASS_HELMET].append(bbox)
+                    scores[CLASS_HELMET].append(conf)
+                elif cls_name in ("license_plate", "number_plate", "plate"):
+                    bboxes[CLASS_PLATE].append(bbox)
+                    scores[CLASS_PLATE].append(conf)
+        
+        # Extract lists
+        persons = bboxes[CLASS_PERSON]
+        bikes = bboxes[CLASS_BIKE]
+        helmets = bboxes[CLASS_HELMET]
+        plates = bboxes[CLASS_PLATE]
+        
+        # Detect violations using spatial reasoning
+        violations = []
+        
+        # Add direct violations from custom Indonesian model
+        if self.model_type == "custom_indonesian" and direct_violations:
+            violations.extend(direct_violations)
+            print(f"✨ Custom model detected {len(direct_violations)} direct violations (TanpaHelm)!")
+        
+        # Struct-of-arrays views so the per-bike checks run vectorized
+        person_arr = BBoxArray.from_list(persons)
+        helmet_arr = BBoxArray.from_list(helmets)
+        
+        # Continue with spatial reasoning for additional violations
+        for bike_bbox in bikes:
+            # Assign riders to this bike using spatial logic
+            riders = assign_riders_to_bike(bike_bbox, person_arr)
+            rider_count = len(riders)
             
-            # 3. Draw helmets (blue)
-            for helmet_bbox in helmets:
-                x1, y1, x2, y2 = helmet_bbox
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), (255, 0, 0), 3)  # Blue
-                cv2.putText(annotated, 'Helmet Detected', (x1, y1-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+            # Check triple riding
+            if rider_count >= 3:
+                violations.append({
+                    "type": "triple_riding",
+                    "bike_bbox": bike_bbox,
+                    "riders": rider_count,
+                    "confidence": 0.90
+                })
             
-            # 4. Draw license plates (orange) with OCR extraction
-            plate_numbers = []
-            for plate_bbox in plates:
-                x1, y1, x2, y2 = plate_bbox
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 165, 255), 3)  # Orange
-                
-                # Extract plate region and run OCR
-                plate_region = frame[y1:y2, x1:x2]
-                if plate_region.size > 0:
-                    plate_text = self.plate_reader.read_plate(plate_region)
-                    if plate_text and plate_text != 'UNKNOWN':
-                        plate_numbers.append({
-                            'number': plate_text,
-                            'bbox': plate_bbox,
-                            'confidence': 0.85
+            # Check helmet violations for each rider (skip if already detected directly)
+            if self.model_type != "custom_indonesian":  # Only do spatial check for non-custom models
+                for rider_bbox in riders:
+                    if not has_helmet_for_person(rider_bbox, helmet_arr):
+                        violations.append({
+                            "type": "helmet_violation",
+                            "rider_bbox": rider_bbox,
+                            "bike_bbox": bike_bbox,
+                            "confidence": 0.85
                         })
-                        label = f'Plate: {plate_text}'
-                    else:
-                        label = 'License Plate'
-                else:
-                    label = 'License Plate'
-                
-                cv2.putText(annotated, label, (x1, y1-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+        
+        # Read license plates with OCR
+        plate_numbers = []
+        plate_labels = {}  # bbox -> annotation label
+        for plate_bbox in plates:
+            x1, y1, x2, y2 = plate_bbox
+            plate_region = frame[y1:y2, x1:x2]
+            label = 'License Plate'
+            if plate_region.size > 0:
+                plate_text = self.plate_reader.read_plate(plate_region)
+                if plate_text and plate_text != 'UNKNOWN':
+                    plate_numbers.append({
+                        'number': plate_text,
+                        'bbox': plate_bbox,
+                        'confidence': 0.85
+                    })
+                    label = f'Plate: {plate_text}'
+            plate_labels[plate_bbox] = label
+        
+        # Generate custom color-coded annotated image (skipped entirely if not wanted)
+        annotated = None
+        if annotate:
+            annotated = self._annotate(frame, violations, bikes, persons, helmets, plates, plate_labels)
+        
+        # Prepare metadata
+        metadata = {
+            "violations": violations,
+            "counts": {
+                "persons": len(persons),
+                "bikes": len(bikes),
+                "helmets": len(helmets),
+                "plates": len(plates)
+            },
+            "bboxes": bboxes,
+            "scores": scores,
+            "plate_numbers": plate_numbers,
+            "is_vehicle_image": len(bikes) > 0 or len(persons) > 0,
+            "raw_result": results if keep_raw else None
+        }
+        metadata.update(_annotation_outputs(annotated, annotate))
+        
+        return metadata
+    
+    def _annotate(self, frame, violations, bikes, persons, helmets, plates, plate_labels):
+        """Draw color-coded boxes, labels and the violation summary panel on a copy of frame"""
+        annotated = frame.copy()
+        
+        # Create violation lookup for detailed labeling
+        violation_map = {}  # bbox -> list of violations
+        for v in violations:
+            if 'rider_bbox' in v:
+                if v['rider_bbox'] not in violation_map:
+                    violation_map[v['rider_bbox']] = []
+                violation_map[v['rider_bbox']].append(v)
+            if 'bike_bbox' in v:
+                if v['bike_bbox'] not in violation_map:
+                    violation_map[v['bike_bbox']] = []
+                violation_map[v['bike_bbox']].append(v)
+            if 'bbox' in v:  # For direct TanpaHelm detections
+                if v['bbox'] not in violation_map:
+                    violation_map[v['bbox']] = []
+                violation_map[v['bbox']].append(v)
+        
+        # Draw bounding boxes with color coding and detailed labels
+        # 1. Draw bikes (green if compliant, red if violation)
+        for bike_bbox in bikes:
+            is_violation = bike_bbox in violation_map
+            color = (0, 0, 255) if is_violation else (0, 255, 0)  # Red or Green
+            x1, y1, x2, y2 = bike_bbox
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 3)
             
-            # Add violation summary panel at top
-            y_offset = 30
-            if violations:
-                # Semi-transparent background for violation panel
-                overlay = annotated.copy()
-                cv2.rectangle(overlay, (10, 10), (400, 30 + len(violations) * 35), (0, 0, 0), -1)
-                cv2.addWeighted(overlay, 0.6, annotated, 0.4, 0, annotated)
-                
-                cv2.putText(annotated, f"VIOLATIONS DETECTED: {len(violations)}", (20, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                y_offset = 60
-                for v in violations:
+            if is_violation:
+                # Show violation-specific labels with confidence
+                violations_here = violation_map[bike_bbox]
+                y_label = y1 - 10
+                for v in violations_here:
                     vtype = v['type'].replace('_', ' ').title()
                     conf = v.get('confidence', 0.0) * 100
-                    text = f"{vtype} ({conf:.0f}%)"
-                    cv2.putText(annotated, text, (20, y_offset), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                    y_offset += 30
+                    label = f"{vtype} {conf:.0f}%"
+                    cv2.putText(annotated, label, (x1, y_label), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+                    y_label -= 20
             else:
-                # No violations message
-                cv2.putText(annotated, "No Violations Detected", (20, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-            
-            # Prepare metadata
-            metadata = {
-                "violations": violations,
-                "counts": {
-                    "persons": len(persons),
-                    "bikes": len(bikes),
-                    "helmets": len(helmets),
-                    "plates": len(plates)
-                },
-                "bboxes": bboxes,
-                "scores": scores,
-                "plate_numbers": plate_numbers,
-                "is_vehicle_image": len(bikes) > 0 or len(persons) > 0,
-                "annotated_image": annotated,
-                "raw_result": results
-            }
+                cv2.putText(annotated, 'Compliant Vehicle', (x1, y1-10), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        
+        # 2. Draw persons/riders (red if violation, green if compliant)
+        for person_bbox in persons:
+            is_violation = person_bbox in violation_map
+            color = (0, 0, 255) if is_violation else (0, 255, 0)  # Red or Green
+            x1, y1, x2, y2 = person_bbox
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 3)
             
-            return metadata
+            if is_violation:
+                # Show violation-specific labels with confidence
+                violations_here = violation_map[person_bbox]
+                y_label = y1 - 10
+                for v in violations_here:
+                    vtype = v['type'].replace('_', ' ').title()
+                    conf = v.get('confidence', 0.0) * 100
+                    label = f"{vtype} {conf:.0f}%"
+                    cv2.putText(annotated, label, (x1, y_label), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+                    y_label -= 20
+            else:
+                cv2.putText(annotated, 'Compliant Rider', (x1, y1-10), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        
+        # 3. Draw helmets (blue)
+        for helmet_bbox in helmets:
+            x1, y1, x2, y2 = helmet_bbox
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (255, 0, 0), 3)  # Blue
+            cv2.putText(annotated, 'Helmet Detected', (x1, y1-10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+        
+        # 4. Draw license plates (orange) with their OCR text
+        for plate_bbox in plates:
+            x1, y1, x2, y2 = plate_bbox
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 165, 255), 3)  # Orange
+            cv2.putText(annotated, plate_labels[plate_bbox], (x1, y1-10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+        
+        # Add violation summary panel at top
+        y_offset = 30
+        if violations:
+            # Semi-transparent background for violation panel
+            overlay = annotated.copy()
+            cv2.rectangle(overlay, (10, 10), (400, 30 + len(violations) * 35), (0, 0, 0), -1)
+            cv2.addWeighted(overlay, 0.6, annotated, 0.4, 0, annotated)
             
-        except Exception as e:
-            print(f"Error in YOLO detection: {e}")
-            import traceback
-            traceback.print_exc()
-            return self._fallback_detection(frame)
+            cv2.putText(annotated, f"VIOLATIONS DETECTED: {len(violations)}", (20, 30), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            y_offset = 60
+            for v in violations:
+                vtype = v['type'].replace('_', ' ').title()
+                conf = v.get('confidence', 0.0) * 100
+                text = f"{vtype} ({conf:.0f}%)"
+                cv2.putText(annotated, text, (20, y_offset), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                y_offset += 30
+        else:
+            # No violations message
+            cv2.putText(annotated, "No Violations Detected", (20, 30), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        
+        return annotated
     
     def _to_bbox(self, xyxy) -> BBox:
         """Convert YOLO xyxy format to bbox tuple"""
         x1, y1, x2, y2 = map(int, xyxy)
         return (x1, y1, x2, y2)
     
-    def _fallback_detection(self, frame):
+    def _fallback_detection(self, frame, annotate=True):
         """Simple fallback detection when YOLO unavailable"""
         violations = []
         
@@ -376,16 +672,17 @@ class ViolationDetector:
                         "confidence": 0.65
                     })
         
-        return {
+        metadata = {
             "violations": violations,
             "counts": {"persons": 0, "bikes": vehicle_count, "helmets": 0, "plates": 0},
             "bboxes": {CLASS_PERSON: [], CLASS_BIKE: [], CLASS_HELMET: [], CLASS_PLATE: []},
             "scores": {CLASS_PERSON: [], CLASS_BIKE: [], CLASS_HELMET: [], CLASS_PLATE: []},
             "plate_numbers": [],
             "is_vehicle_image": vehicle_count > 0,
-            "annotated_image": frame.copy(),
             "raw_result": None
         }
+        metadata.update(_annotation_outputs(frame.copy() if annotate else None, annotate))
+        return metadata
     
     def extract_plate_region(self, frame, bbox):
         """Extract license plate region from frame"""
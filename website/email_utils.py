@@ -4,14 +4,11 @@ Uses Replit Mail service for reliable email delivery
 """
 
 import os
-import sys
 import json
 import requests
 from datetime import datetime
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
-from db.models import DatabaseManager
+from website.database import DatabaseManager
 from configs.config import DATABASE_PATH
 
 def get_replit_auth_token():
@@ -4,14 +4,11 @@ Uses ReportLab for high-quality violation reports
 """
 
 import os
-import sys
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
 # Fine amounts
 FINES = {
     "helmet_violation": 500,   # First offense
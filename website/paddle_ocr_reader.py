@@ -3,14 +3,11 @@ PaddleOCR-based license plate recognition
 Superior accuracy compared to EasyOCR for Indian plates
 """
 
-import sys
 import os
 import cv2
 import re
 from typing import Tuple
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
 
 class PaddleOCRReader:
     """License plate reader using PaddleOCR"""
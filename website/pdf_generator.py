@@ -3,40 +3,147 @@ PDF E-Challan Generator for Road Safety Violation Detector
 Generates official violation PDFs with embedded images
 """
 
-import sys
 import os
-from datetime import datetime
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from io import BytesIO
+from datetime import datetime, timezone
 
-from fpdf import FPDF
-from db.models import DatabaseManager
+import cv2
+from fpdf import FPDF, XPos, YPos
+from PIL import Image
+from website.database import DatabaseManager
 from configs.config import DATABASE_PATH, REPORTS_STORAGE
 
+# Print resolution for embedded evidence; larger images are downscaled first
+EVIDENCE_IMAGE_DPI = 150
+
+# Static challan text, identical on every document
+PAYMENT_INSTRUCTIONS = (
+    '1. Pay the fine within 15 days to avoid additional charges',
+    '2. Visit the nearest traffic police station for payment',
+    '3. Keep this challan as proof of payment',
+    '4. For any queries, contact the traffic helpline',
+)
+AUTHORITY_NOTE = 'This is a computer-generated challan and does not require a signature.'
+
 class EchallanPDF(FPDF):
     """Custom PDF class for e-challans"""
     
     def header(self):
         """PDF header"""
         # Logo placeholder (you could add an actual logo here)
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, 'ROAD SAFETY VIOLATION E-CHALLAN', 0, 1, 'C')
-        self.set_font('Arial', 'I', 10)
-        self.cell(0, 10, 'Traffic Management System', 0, 1, 'C')
+        self.set_font('helvetica', 'B', 16)
+        self.cell(0, 10, 'ROAD SAFETY VIOLATION E-CHALLAN', align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.set_font('helvetica', 'I', 10)
+        self.cell(0, 10, 'Traffic Management System', align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         self.ln(10)
     
     def footer(self):
         """PDF footer"""
         self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', 0, 0, 'L')
-        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'R')
+        self.set_font('helvetica', 'I', 8)
+        self.cell(0, 10, f'Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+        self.cell(0, 10, f'Page {self.page_no()}', align='R')
+    
+    def section_header(self, title):
+        """Bold section title followed by a horizontal rule"""
+        self.set_font('helvetica', 'B', 12)
+        self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.line(10, self.get_y(), 200, self.get_y())
+        self.ln(5)
+    
+    def payment_instructions(self):
+        """Fixed instructions block and authority note that close every challan"""
+        self.section_header('PAYMENT INSTRUCTIONS')
+        self.set_font('helvetica', '', 9)
+        for instruction in PAYMENT_INSTRUCTIONS:
+            self.cell(0, 6, instruction, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.ln(10)
+        
+        # Authority section
+        self.set_font('helvetica', 'I', 9)
+        self.cell(0, 6, AUTHORITY_NOTE, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+def _encode_jpeg(image, quality=85):
+    """Encode an OpenCV BGR image to an in-memory JPEG stream"""
+    ok, buf = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode image as JPEG")
+    return BytesIO(buf.tobytes())
+
+def _evidence_image_source(image_path, width_mm, height_mm):
+    """
+    Prepare an evidence image for pdf.image
+
+    JPEGs that already fit the printed size are embedded from disk as-is.
+    Anything larger than EVIDENCE_IMAGE_DPI at the printed size is downscaled
+    and re-encoded in memory, so camera frames don't bloat the PDF.
+    """
+    max_w = round(width_mm / 25.4 * EVIDENCE_IMAGE_DPI)
+    max_h = round(height_mm / 25.4 * EVIDENCE_IMAGE_DPI)
+    
+    # Only the header is read here, not the pixel data
+    with Image.open(image_path) as img:
+        w, h = img.size
+    
+    oversized = w > max_w or h > max_h
+    is_jpeg = os.path.splitext(image_path)[1].lower() in ('.jpg', '.jpeg')
+    if is_jpeg and not oversized:
+        return image_path
+    
+    image = cv2.imread(image_path)
+    if oversized:
+        scale = min(max_w / w, max_h / h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return _encode_jpeg(image, quality=80)
+    return _encode_jpeg(image)
+
+def _write_atomic(path, data):
+    """Write bytes to a temp file and rename it over path, so readers never see a partial PDF"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _existing_pdf_path(violation):
+    """
+    Return the violation's PDF path if it is still current, else None
+    
+    The PDF is current when the file exists and was written after the last
+    change to the violation record (its timestamp and, once paid, paid_at).
+    """
+    if not violation.get('pdf_path'):
+        return None
+    
+    # pdf_path is a filename in REPORTS_STORAGE (older rows stored the joined path)
+    pdf_path = os.path.join(REPORTS_STORAGE, os.path.basename(violation['pdf_path']))
+    if not os.path.exists(pdf_path):
+        return None
+    
+    pdf_mtime = os.path.getmtime(pdf_path)
+    for field in ('timestamp', 'paid_at'):
+        value = violation.get(field)
+        if not value:
+            continue
+        try:
+            changed = datetime.strptime(str(value)[:19], '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return None
+        # SQLite CURRENT_TIMESTAMP values are UTC, but paid_at is written in local
+        # time; the PDF must be newer than the change under either reading
+        changed_at = max(changed.replace(tzinfo=timezone.utc).timestamp(), changed.timestamp())
+        if changed_at >= pdf_mtime:
+            return None
+    
+    return pdf_path
 
-def build_pdf(violation_id):
+def build_pdf(violation_id, force=False):
     """
     Generate PDF e-challan for a violation
     
     Args:
         violation_id (int): Violation ID
+        force (bool): Regenerate even if an up-to-date PDF already exists
         
     Returns:
         str: Path to generated PDF file or None if failed
@@ -50,75 +157,78 @@ def build_pdf(violation_id):
             print(f"Violation ID {violation_id} not found")
             return None
         
+        # Reuse the existing PDF unless the record changed since it was written
+        if not force:
+            existing_path = _existing_pdf_path(violation)
+            if existing_path:
+                return existing_path
+        
         # Get owner information
         owner = db.get_owner_by_vehicle(violation['vehicle_no'])
         
         # Create PDF
         pdf = EchallanPDF()
+        # Embed JPEG evidence as-is (DCTDecode) instead of re-encoding to FlateDecode
+        pdf.set_image_filter("DCTDecode")
+        pdf.set_compression(True)  # FlateDecode text/graphics content streams
         pdf.add_page()
         
         # Title section
-        pdf.set_font('Arial', 'B', 14)
-        pdf.cell(0, 10, 'TRAFFIC VIOLATION NOTICE', 0, 1, 'C')
+        pdf.set_font('helvetica', 'B', 14)
+        pdf.cell(0, 10, 'TRAFFIC VIOLATION NOTICE', align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.ln(5)
         
         # Violation details section
-        pdf.set_font('Arial', 'B', 12)
-        pdf.cell(0, 10, 'VIOLATION DETAILS', 0, 1, 'L')
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(5)
+        pdf.section_header('VIOLATION DETAILS')
         
-        pdf.set_font('Arial', '', 10)
+        pdf.set_font('helvetica', '', 10)
         
         # Two-column layout for details
         col1_x = 10
         col2_x = 110
         
         pdf.set_xy(col1_x, pdf.get_y())
-        pdf.cell(90, 8, f'Challan No: #{violation["id"]:06d}', 0, 0, 'L')
+        pdf.cell(90, 8, f'Challan No: #{violation["id"]:06d}')
         pdf.set_xy(col2_x, pdf.get_y())
-        pdf.cell(90, 8, f'Date: {violation["timestamp"][:19]}', 0, 1, 'L')
+        pdf.cell(90, 8, f'Date: {violation["timestamp"][:19]}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         pdf.set_xy(col1_x, pdf.get_y())
-        pdf.cell(90, 8, f'Vehicle No: {violation["vehicle_no"]}', 0, 0, 'L')
+        pdf.cell(90, 8, f'Vehicle No: {violation["vehicle_no"]}')
         pdf.set_xy(col2_x, pdf.get_y())
-        pdf.cell(90, 8, f'Fine Amount: Rs. {violation["fine_amount"]}', 0, 1, 'L')
+        pdf.cell(90, 8, f'Fine Amount: Rs. {violation["fine_amount"]}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         if owner:
             pdf.set_xy(col1_x, pdf.get_y())
-            pdf.cell(90, 8, f'Owner Name: {owner["owner_name"]}', 0, 0, 'L')
+            pdf.cell(90, 8, f'Owner Name: {owner["owner_name"]}')
         
         # Payment status
         if violation.get('paid'):
             pdf.set_xy(col2_x, pdf.get_y())
             pdf.set_text_color(0, 128, 0)  # Green color
-            pdf.cell(90, 8, 'STATUS: PAID', 0, 1, 'L')
+            pdf.cell(90, 8, 'STATUS: PAID', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             pdf.set_text_color(0, 0, 0)  # Reset to black
         else:
             pdf.set_xy(col2_x, pdf.get_y())
             pdf.set_text_color(255, 0, 0)  # Red color
-            pdf.cell(90, 8, 'STATUS: UNPAID', 0, 1, 'L')
+            pdf.cell(90, 8, 'STATUS: UNPAID', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             pdf.set_text_color(0, 0, 0)  # Reset to black
         
         # Location if available
         if violation.get('location_text'):
             pdf.set_xy(col1_x, pdf.get_y())
-            pdf.cell(180, 8, f'Location: {violation["location_text"]}', 0, 1, 'L')
+            pdf.cell(180, 8, f'Location: {violation["location_text"]}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         pdf.ln(5)
         
         # Violation type section
-        pdf.set_font('Arial', 'B', 12)
-        pdf.cell(0, 10, 'VIOLATION TYPE', 0, 1, 'L')
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(5)
+        pdf.section_header('VIOLATION TYPE')
         
-        pdf.set_font('Arial', '', 11)
-        pdf.cell(0, 8, violation['violation_type'], 0, 1, 'L')
+        pdf.set_font('helvetica', '', 11)
+        pdf.cell(0, 8, violation['violation_type'], new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         if violation['description']:
             pdf.ln(3)
-            pdf.set_font('Arial', '', 10)
+            pdf.set_font('helvetica', '', 10)
             pdf.multi_cell(0, 5, violation['description'])
         
         pdf.ln(10)
@@ -141,91 +251,64 @@ def build_pdf(violation_id):
                     break
         
         if image_path:
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, 'VIOLATION EVIDENCE', 0, 1, 'L')
-            pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-            pdf.ln(5)
+            pdf.section_header('VIOLATION EVIDENCE')
             
             try:
                 # Add image to PDF
                 img_width = 120
                 img_height = 80
-                pdf.image(image_path, x=45, y=pdf.get_y(), w=img_width, h=img_height)
+                image_source = _evidence_image_source(image_path, img_width, img_height)
+                pdf.image(image_source, x=45, y=pdf.get_y(), w=img_width, h=img_height)
                 pdf.ln(img_height + 10)
                 print(f"✅ Image added to PDF: {image_path}")
             except Exception as e:
                 print(f"❌ Could not add image to PDF: {e}")
-                pdf.cell(0, 8, '[Image could not be embedded]', 0, 1, 'L')
+                pdf.cell(0, 8, '[Image could not be embedded]', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
                 pdf.ln(5)
         else:
             print(f"❌ Image not found for paths: {violation['image_path']}")
             # Still add the evidence section but with a note
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, 'VIOLATION EVIDENCE', 0, 1, 'L')
-            pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-            pdf.ln(5)
-            pdf.set_font('Arial', '', 10)
-            pdf.cell(0, 8, '[Evidence image not available]', 0, 1, 'L')
+            pdf.section_header('VIOLATION EVIDENCE')
+            pdf.set_font('helvetica', '', 10)
+            pdf.cell(0, 8, '[Evidence image not available]', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             pdf.ln(5)
         
         # Fine details section
-        pdf.set_font('Arial', 'B', 12)
-        pdf.cell(0, 10, 'FINE DETAILS', 0, 1, 'L')
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(5)
+        pdf.section_header('FINE DETAILS')
         
-        pdf.set_font('Arial', '', 10)
-        pdf.cell(0, 8, f'Fine Amount: Rs. {violation["fine_amount"]}', 0, 1, 'L')
+        pdf.set_font('helvetica', '', 10)
+        pdf.cell(0, 8, f'Fine Amount: Rs. {violation["fine_amount"]}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         # Payment information
         if violation.get('paid'):
             pdf.set_text_color(0, 128, 0)  # Green color
-            pdf.cell(0, 8, f'Payment Status: PAID', 0, 1, 'L')
-            pdf.cell(0, 8, f'Payment ID: {violation.get("payment_id", "N/A")}', 0, 1, 'L')
-            pdf.cell(0, 8, f'Payment Date: {violation.get("paid_at", "N/A")}', 0, 1, 'L')
+            pdf.cell(0, 8, f'Payment Status: PAID', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pdf.cell(0, 8, f'Payment ID: {violation.get("payment_id", "N/A")}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pdf.cell(0, 8, f'Payment Date: {violation.get("paid_at", "N/A")}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             pdf.set_text_color(0, 0, 0)  # Reset to black
         else:
             pdf.set_text_color(255, 0, 0)  # Red color
-            pdf.cell(0, 8, 'Payment Status: UNPAID', 0, 1, 'L')
+            pdf.cell(0, 8, 'Payment Status: UNPAID', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             pdf.set_text_color(0, 0, 0)  # Reset to black
-            pdf.cell(0, 8, 'Payment due within 15 days from the date of issue', 0, 1, 'L')
-        
-        pdf.ln(5)
+            pdf.cell(0, 8, 'Payment due within 15 days from the date of issue', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
-        # Instructions section
-        pdf.set_font('Arial', 'B', 12)
-        pdf.cell(0, 10, 'PAYMENT INSTRUCTIONS', 0, 1, 'L')
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
         pdf.ln(5)
         
-        pdf.set_font('Arial', '', 9)
-        instructions = [
-            '1. Pay the fine within 15 days to avoid additional charges',
-            '2. Visit the nearest traffic police station for payment',
-            '3. Keep this challan as proof of payment',
-            '4. For any queries, contact the traffic helpline'
-        ]
-        
-        for instruction in instructions:
-            pdf.cell(0, 6, instruction, 0, 1, 'L')
-        
-        pdf.ln(10)
-        
-        # Authority section
-        pdf.set_font('Arial', 'I', 9)
-        pdf.cell(0, 6, 'This is a computer-generated challan and does not require a signature.', 0, 1, 'C')
+        # Instructions and authority note
+        pdf.payment_instructions()
         
         # Save PDF
         os.makedirs(REPORTS_STORAGE, exist_ok=True)
         pdf_filename = f"challan_{violation_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         pdf_path = os.path.join(REPORTS_STORAGE, pdf_filename)
         
-        pdf.output(pdf_path)
+        # Render in memory, then write the finished file in one step
+        _write_atomic(pdf_path, bytes(pdf.output()))
         
-        # Update database with PDF path
+        # Update database with the PDF filename; readers join it onto REPORTS_STORAGE
         conn = db.get_connection()
         cursor = conn.cursor()
-        cursor.execute('UPDATE violations SET pdf_path = ? WHERE id = ?', (pdf_path, violation_id))
+        cursor.execute('UPDATE violations SET pdf_path = ? WHERE id = ?', (pdf_filename, violation_id))
         conn.commit()
         conn.close()
         
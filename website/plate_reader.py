@@ -1,35 +1,70 @@
 """
-OCR service wrapper for web app integration  
+OCR service wrapper for web app integration
 """
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import threading
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from website.plate_reader_impl import PlateReader
+
+# Shared reader so EasyOCR weights are loaded (onto the GPU if available) once per process
+_READER: Optional[PlateReader] = None
+_READER_LOCK = threading.Lock()
+
+
+def get_plate_reader() -> PlateReader:
+    """Return the process-wide PlateReader, creating it on first use"""
+    global _READER
+    if _READER is None:
+        with _READER_LOCK:
+            if _READER is None:
+                _READER = PlateReader(gpu=True)
+    return _READER
+
+
+def _load_image(image_path):
+    """Decode an image file, also handling non-ASCII paths that cv2.imread rejects"""
+    try:
+        data = np.fromfile(image_path, dtype=np.uint8)
+    except OSError:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
 
-from road_safety_violation_detector.website.plate_reader import PlateReader
 
 def extract_plate_number(image_path):
     """
     Extract license plate number from image
-    
+
     Args:
         image_path (str): Path to the image file
-        
+
     Returns:
         str: Extracted license plate number or None
     """
-
-    import cv2
-    
     # Read image
-    image = cv2.imread(image_path)
+    image = _load_image(image_path)
     if image is None:
         return None
-    
-    # Initialize plate reader
-    reader = PlateReader()
-    
+
     # Extract plate
-    plate_text = reader.read_plate(image)
-    
-    return plate_text if plate_text != 'UNKNOWN' else None
\ No newline at end of file
+    plate_text = get_plate_reader().read_plate(image)
+
+    return plate_text if plate_text != 'UNKNOWN' else None
+
+
+def extract_plate_numbers(image_paths: List[str]) -> List[Optional[str]]:
+    """
+    Extract license plate numbers from several images with one batched OCR call
+
+    Args:
+        image_paths (list): Paths to the image files
+
+    Returns:
+        list: Plate number or None for each path, in input order
+    """
+    images = [_load_image(path) for path in image_paths]
+    plates = get_plate_reader().read_plates_batch(images)
+    return [plate if plate != 'UNKNOWN' else None for plate in plates]
@@ -0,0 +1,105 @@
+"""
+EasyOCR-based license plate recognition
+Reads Indian number plates from cropped plate regions
+"""
+
+import re
+
+# Indian plate format: 2 letters, 2 digits, 1-2 letters, 4 digits
+INDIAN_PLATE_PATTERN = r'^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$'
+
+# Crops are resized to this (width, height) so they can be stacked for batched OCR
+BATCH_INPUT_SIZE = (320, 96)
+
+
+class PlateReader:
+    """License plate reader using EasyOCR"""
+
+    def __init__(self, gpu=False):
+        self.reader = None
+        self.gpu = gpu
+        self.load_ocr()
+
+    def load_ocr(self):
+        """Load EasyOCR model"""
+        try:
+            import easyocr
+            self.reader = easyocr.Reader(['en'], gpu=self.gpu, verbose=False)
+            print("EasyOCR loaded successfully")
+        except ImportError:
+            print("EasyOCR not available. Plate reading disabled")
+            self.reader = None
+        except Exception as e:
+            print(f"Error loading EasyOCR: {e}")
+            self.reader = None
+
+    def read_plate(self, image):
+        """
+        Read license plate text from image
+
+        Args:
+            image (numpy.ndarray): Input image containing number plate
+
+        Returns:
+            str: Plate text or 'UNKNOWN'
+        """
+        if self.reader is None or image is None or image.size == 0:
+            return 'UNKNOWN'
+
+        try:
+            return self._best_plate_text(self.reader.readtext(image))
+        except Exception as e:
+            print(f"OCR error: {e}")
+            return 'UNKNOWN'
+
+    def read_plates_batch(self, images):
+        """
+        Read license plate text from several images in one OCR call
+
+        Args:
+            images (list): Plate images (numpy.ndarray)
+
+        Returns:
+            list: Plate text or 'UNKNOWN' for each image, in input order
+        """
+        plates = ['UNKNOWN'] * len(images)
+        valid = [i for i, image in enumerate(images) if image is not None and image.size > 0]
+        if self.reader is None or not valid:
+            return plates
+
+        try:
+            width, height = BATCH_INPUT_SIZE
+            batch_results = self.reader.readtext_batched(
+                [images[i] for i in valid], n_width=width, n_height=height
+            )
+            for i, results in zip(valid, batch_results):
+                plates[i] = self._best_plate_text(results)
+        except Exception as e:
+            print(f"Batched OCR error, reading plates one by one: {e}")
+            for i in valid:
+                plates[i] = self.read_plate(images[i])
+        return plates
+
+    def _best_plate_text(self, results):
+        """Pick the highest confidence EasyOCR result and normalize it"""
+        if not results:
+            return 'UNKNOWN'
+        best_result = max(results, key=lambda x: x[2])
+        return self._normalize_plate_text(best_result[1])
+
+    def _normalize_plate_text(self, text: str) -> str:
+        """Normalize OCR output to Indian plate format (e.g. MH01AB1234)"""
+        if not text:
+            return 'UNKNOWN'
+
+        # Remove spaces and special characters
+        clean_text = re.sub(r'[^A-Z0-9]', '', text.upper())
+
+        if re.match(INDIAN_PLATE_PATTERN, clean_text):
+            return clean_text
+
+        # Accept plate-like lengths even if the pattern does not match exactly
+        if 8 <= len(clean_text) <= 10:
+            return clean_text
+
+        return 'UNKNOWN'
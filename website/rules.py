@@ -2,14 +2,63 @@
 Fine calculation logic for Road Safety Violation Detector
 """
 
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import threading
+
+from cachetools import TTLCache
 
 from configs.config import FIRST_OFFENSE_FINE, REPEAT_OFFENSE_FINE
 from db.models import DatabaseManager
 
-def compute_fine(vehicle_no, violation_type, db):
+# Previous-violation counts per vehicle, bounded and refreshed every 60s
+_count_cache = TTLCache(maxsize=4096, ttl=60)
+# TTLCache is not thread-safe; the worker records violations on a background thread
+_count_lock = threading.Lock()
+# Database file state the cached counts were read at
+_count_stamp = None
+
+def _database_stamp(db):
+    """
+    Size and mtime of the database file and its WAL
+    
+    Any commit changes one of them, including commits from other processes
+    (seed_demo_data, the worker, other web workers), which the in-process
+    invalidation cannot see.
+    """
+    db_path = getattr(db, 'db_path', None)
+    if not db_path:
+        return None
+    stamp = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def count_previous_violations(vehicle_no, db):
+    """Cached wrapper around DatabaseManager.count_previous_violations"""
+    global _count_stamp
+    stamp = _database_stamp(db)
+    with _count_lock:
+        # The database changed since the counts were cached
+        if stamp != _count_stamp:
+            _count_cache.clear()
+            _count_stamp = stamp
+        count = _count_cache.get(vehicle_no)
+    if count is None:
+        count = db.count_previous_violations(vehicle_no)
+        with _count_lock:
+            _count_cache[vehicle_no] = count
+    return count
+
+def invalidate_violation_count(vehicle_no):
+    """Drop the cached count for a vehicle after inserting a new violation"""
+    with _count_lock:
+        _count_cache.pop(vehicle_no, None)
+
+def compute_fine(vehicle_no, violation_type, db, pending_violations=0):
     """
     Compute fine amount based on violation history
     
@@ -17,12 +66,13 @@ def compute_fine(vehicle_no, violation_type, db):
         vehicle_no (str): Vehicle number
         violation_type (str): Type of violation
         db (DatabaseManager): Database manager instance
+        pending_violations (int): Violations for this vehicle not yet inserted
     
     Returns:
         int: Fine amount
     """
     # Count previous violations for this vehicle
-    previous_violations = db.count_previous_violations(vehicle_no)
+    previous_violations = count_previous_violations(vehicle_no, db) + pending_violations
     
     # First offense: ₹500, repeat offense: ₹1000
     if previous_violations == 0:
@@ -3,20 +3,18 @@ Quick demo script to test the Road Safety Violation Detector
 Tests detection on sample images and verifies system functionality
 """
 
-import sys
 import os
 import cv2
 import numpy as np
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from road_safety_violation_detector.website.detect import ViolationDetector
-from road_safety_violation_detector.website.plate_reader import PlateReader
-from road_safety_violation_detector.website.pdf_generator import generate_sample_pdf
-from db.models import DatabaseManager
+from website.detect import ViolationDetector
+from website.plate_reader import get_plate_reader
+from website.pdf_generator import generate_sample_pdf
+from website.database import DatabaseManager
 from configs.config import DATABASE_PATH, VIOLATIONS_STORAGE
 
-def create_test_image():
-    """Create a simple test image for detection demo"""
+def _draw_test_image():
+    """Draw the test scene used by the detection demo"""
     # Create a test image with a vehicle-like shape
     img = np.ones((400, 600, 3), dtype=np.uint8) * 200  # Light gray background
     
@@ -44,6 +42,13 @@ def create_test_image():
     
     return img
 
+# The test scene is static, so it is drawn once and copied on each call
+_TEST_IMAGE = _draw_test_image()
+
+def create_test_image():
+    """Create a simple test image for detection demo"""
+    return _TEST_IMAGE.copy()
+
 def test_detection_system():
     """Test the detection system"""
     print("=== Testing Detection System ===")
@@ -84,7 +89,7 @@ def test_plate_reader():
     print(f"Created test plate image: {plate_path}")
     
     # Initialize plate reader
-    reader = PlateReader()
+    reader = get_plate_reader()
     print(f"Plate reader initialized. EasyOCR available: {reader.reader is not None}")
     
     # Read plate
@@ -3,39 +3,45 @@ Demo data seeding script for Road Safety Violation Detector
 Creates sample violations for demonstration purposes
 """
 
-import sys
 import os
 import cv2
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from db.models import DatabaseManager
+from website.database import DatabaseManager
 from configs.config import DATABASE_PATH, VIOLATIONS_STORAGE
-from road_safety_violation_detector.website.rules import compute_fine
-from road_safety_violation_detector.website.pdf_generator import build_pdf
+from website.rules import compute_fine
+from website.pdf_generator import build_pdf
+
+def _create_base_image():
+    """Draw the parts of the demo violation image that never change"""
+    img = np.ones((300, 400, 3), dtype=np.uint8) * 128  # Gray background
+    
+    # Title
+    cv2.putText(img, "VIOLATION DETECTED", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+    
+    # Add some shapes to simulate a vehicle/road scene
+    cv2.rectangle(img, (100, 150), (300, 250), (100, 100, 100), -1)  # Vehicle shape
+    cv2.rectangle(img, (120, 170), (140, 200), (255, 255, 0), -1)    # License plate
+    
+    return img
+
+# Drawn once at import; create_sample_image only overlays per-violation text
+_BASE_IMAGE = _create_base_image()
 
 def create_sample_image(vehicle_no, violation_type):
     """Create a sample violation image for demo purposes"""
-    # Create a simple demo image
-    img = np.ones((300, 400, 3), dtype=np.uint8) * 128  # Gray background
+    img = _BASE_IMAGE.copy()
     
-    # Add some text to simulate a violation scene
     font = cv2.FONT_HERSHEY_SIMPLEX
     
-    # Title
-    cv2.putText(img, "VIOLATION DETECTED", (50, 50), font, 0.7, (0, 0, 255), 2)
-    
     # Vehicle number
     cv2.putText(img, f"Vehicle: {vehicle_no}", (50, 100), font, 0.6, (255, 255, 255), 2)
     
     # Violation type
     cv2.putText(img, f"Type: {violation_type}", (50, 130), font, 0.5, (255, 255, 255), 1)
     
-    # Add some shapes to simulate a vehicle/road scene
-    cv2.rectangle(img, (100, 150), (300, 250), (100, 100, 100), -1)  # Vehicle shape
-    cv2.rectangle(img, (120, 170), (140, 200), (255, 255, 0), -1)    # License plate
-    
     if violation_type == 'NO_HELMET':
         cv2.circle(img, (200, 160), 15, (255, 0, 0), -1)  # Head without helmet
         cv2.putText(img, "NO HELMET", (160, 280), font, 0.5, (0, 0, 255), 2)
@@ -155,21 +161,29 @@ def seed_demo_violations():
         conn.commit()
         conn.close()
         
-        # Generate PDF
-        pdf_path = build_pdf(violation_id)
-        
         created_violations.append({
             'id': violation_id,
             'vehicle_no': vehicle_no,
             'violation_type': violation_type,
             'fine_amount': fine_amount,
             'image_path': img_path,
-            'pdf_path': pdf_path
+            'pdf_path': None
         })
         
         print(f"  Created violation ID: {violation_id}, Fine: ₹{fine_amount}")
+    
+    # Generate PDFs in parallel once all rows are committed
+    # (each worker opens its own database connection inside build_pdf)
+    violation_ids = [v['id'] for v in created_violations]
+    # No more processes than PDFs to build (each one re-imports the app's modules)
+    max_workers = max(1, min(len(violation_ids), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pdf_paths = list(executor.map(build_pdf, violation_ids))
+    
+    for violation, pdf_path in zip(created_violations, pdf_paths):
+        violation['pdf_path'] = pdf_path
         if pdf_path:
-            print(f"  Generated PDF: {pdf_path}")
+            print(f"  Generated PDF for violation {violation['id']}: {pdf_path}")
     
     print(f"\nDemo data seeding complete! Created {len(created_violations)} violations.")
     
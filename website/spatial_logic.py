@@ -2,17 +2,60 @@
 Spatial reasoning logic for advanced violation detection
 Includes rider-to-bike assignment and helmet-to-person matching
 """
-from typing import List, Tuple
+from dataclasses import dataclass
+from typing import List, Tuple, Union
+
+import numpy as np
 
 BBox = Tuple[int, int, int, int]
 
 
+@dataclass
+class BBoxArray:
+    """Bounding boxes stored as four parallel int32 coordinate arrays"""
+    x1: np.ndarray
+    y1: np.ndarray
+    x2: np.ndarray
+    y2: np.ndarray
+
+    @classmethod
+    def from_list(cls, boxes: List[BBox]) -> "BBoxArray":
+        """Build from a list of (x1, y1, x2, y2) tuples"""
+        coords = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        return cls(*(np.ascontiguousarray(coords[:, i]) for i in range(4)))
+
+    def to_list(self) -> List[BBox]:
+        """Convert back to a list of (x1, y1, x2, y2) tuples"""
+        return list(zip(self.x1.tolist(), self.y1.tolist(), self.x2.tolist(), self.y2.tolist()))
+
+    def __len__(self) -> int:
+        return len(self.x1)
+
+    def __getitem__(self, idx) -> "BBoxArray":
+        """Select boxes by index, slice or boolean mask"""
+        return BBoxArray(self.x1[idx], self.y1[idx], self.x2[idx], self.y2[idx])
+
+
+Boxes = Union[List[BBox], BBoxArray]
+
+
+def _as_bbox_array(boxes: Boxes) -> BBoxArray:
+    """Accept either a list of tuples or a BBoxArray"""
+    return boxes if isinstance(boxes, BBoxArray) else BBoxArray.from_list(boxes)
+
+
 def bbox_center(b: BBox) -> Tuple[float, float]:
     """Calculate center point of bounding box"""
     x1, y1, x2, y2 = b
     return ((x1 + x2) / 2, (y1 + y2) / 2)
 
 
+def bbox_centers(boxes: Boxes) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate center points of many bounding boxes at once"""
+    b = _as_bbox_array(boxes)
+    return (b.x1 + b.x2) * 0.5, (b.y1 + b.y2) * 0.5
+
+
 def point_inside(b: BBox, p: Tuple[float, float]) -> bool:
     """Check if point is inside bounding box"""
     x1, y1, x2, y2 = b
@@ -33,37 +76,57 @@ def iou(a: BBox, b: BBox) -> float:
     return inter / union
 
 
-def head_region(person_bbox: BBox, top_ratio: float = 0.3) -> BBox:
-    """Extract head region from person bounding box (top 30%)"""
+def iou_many(a: BBox, boxes: Boxes) -> np.ndarray:
+    """Calculate IoU between one bounding box and every box in boxes"""
+    b = _as_bbox_array(boxes)
+    ax1, ay1, ax2, ay2 = a
+    inter_w = np.maximum(0, np.minimum(ax2, b.x2) - np.maximum(ax1, b.x1))
+    inter_h = np.maximum(0, np.minimum(ay2, b.y2) - np.maximum(ay1, b.y1))
+    inter = inter_w * inter_h
+    area_a = (ax2 - ax1) * (ay2 - ay1)
+    area_b = (b.x2 - b.x1) * (b.y2 - b.y1)
+    union = area_a + area_b - inter + 1e-6
+    return inter / union
+
+
+def head_region(person_bbox: BBox, top_num: int = 3, top_den: int = 10) -> BBox:
+    """Extract head region from person bounding box (top num/den, default 30%)"""
     x1, y1, x2, y2 = person_bbox
     h = y2 - y1
-    return (x1, y1, x2, int(y1 + top_ratio * h))
+    return (x1, y1, x2, y1 + (h * top_num) // top_den)
+
+
+def _riders_mask(bike_bbox: BBox, persons: BBoxArray) -> np.ndarray:
+    """Boolean mask of persons whose center lies inside the bike bbox"""
+    x1, y1, x2, y2 = bike_bbox
+    cx, cy = bbox_centers(persons)
+    return (x1 <= cx) & (cx <= x2) & (y1 <= cy) & (cy <= y2)
 
 
-def assign_riders_to_bike(bike_bbox: BBox, person_bboxes: List[BBox]) -> List[BBox]:
+def assign_riders_to_bike(bike_bbox: BBox, person_bboxes: Boxes) -> List[BBox]:
     """
     Assign riders to a bike using spatial reasoning.
     A person is considered riding the bike if their center is inside the bike bbox.
     """
-    riders = []
-    for pb in person_bboxes:
-        if point_inside(bike_bbox, bbox_center(pb)):
-            riders.append(pb)
-    return riders
+    persons = _as_bbox_array(person_bboxes)
+    return persons[_riders_mask(bike_bbox, persons)].to_list()
 
 
-def has_helmet_for_person(person_bbox: BBox, helmet_bboxes: List[BBox]) -> bool:
+def has_helmet_for_person(person_bbox: BBox, helmet_bboxes: Boxes) -> bool:
     """
     Check if person has a helmet using head region matching.
     Returns True if any helmet bbox overlaps with the person's head region.
     """
-    head = head_region(person_bbox)
-    for hb in helmet_bboxes:
-        if iou(head, hb) > 0:
-            return True
-    return False
+    hx1, hy1, hx2, hy2 = head_region(person_bbox)
+    helmets = _as_bbox_array(helmet_bboxes)
+    # IoU > 0 exactly when the intersection has positive width and height,
+    # so test that directly instead of computing areas and dividing
+    inter_w = np.minimum(hx2, helmets.x2) - np.maximum(hx1, helmets.x1)
+    inter_h = np.minimum(hy2, helmets.y2) - np.maximum(hy1, helmets.y1)
+    return bool(((inter_w > 0) & (inter_h > 0)).any())
 
 
-def count_riders_on_bike(bike_bbox: BBox, person_bboxes: List[BBox]) -> int:
+def count_riders_on_bike(bike_bbox: BBox, person_bboxes: Boxes) -> int:
     """Count number of riders on a bike"""
-    return len(assign_riders_to_bike(bike_bbox, person_bboxes))
+    persons = _as_bbox_array(person_bboxes)
+    return int(np.count_nonzero(_riders_mask(bike_bbox, persons)))
@@ -2,19 +2,71 @@
 Telangana Police Integrated e-Challan System Integration
 """
 
+import atexit
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import tempfile
 from datetime import datetime, timedelta
 import re
 import time
 import random
+import string
+import threading
+from cachetools import TLRUCache, TTLCache, cachedmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Any
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Basic Indian vehicle number pattern, e.g. TS05FH4947
+_PLATE_RE = re.compile(r'^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$')
+
+# Shared pool for querying the upstream sources concurrently (I/O bound)
+_fetch_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='echallan-fetch')
+
+# Separate pool for per-day recent-challan queries; its size caps concurrent requests
+_day_executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix='echallan-day')
+
+# Demo data only covers this many most recent days
+_DEMO_RECENT_DAYS = 10
+
+# Value pools for demo data, built once instead of on every call
+_VIOLATIONS = (
+    {'type': 'Over Speeding', 'fine': 1000, 'section': 'MV Act 184'},
+    {'type': 'No Helmet', 'fine': 1000, 'section': 'MV Act 129'},
+    {'type': 'Signal Jump', 'fine': 5000, 'section': 'MV Act 177'},
+    {'type': 'Wrong Side Driving', 'fine': 5000, 'section': 'MV Act 184'},
+    {'type': 'Mobile Phone Usage', 'fine': 5000, 'section': 'MV Act 184'},
+)
+_PAY_STATUS = ('Paid', 'Unpaid', 'Pending')
+_PLATE_LETTERS = ('AB', 'CD', 'EF', 'GH')
+_RECENT_VIOLATION_TYPES = ('Over Speeding', 'No Helmet', 'Signal Jump', 'Wrong Parking')
+_RECENT_FINES = (500, 1000, 2000, 5000)
+_RECENT_PAY_STATUS = ('Paid', 'Unpaid')
+
+def _dump(value: Any) -> bytes:
+    """Serialize cache data to JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(value).encode('utf-8')
+
+def _load(data: bytes) -> Any:
+    """Deserialize JSON bytes written by _dump"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 class TelanganaPoliceAPI:
     """
     Integration with Telangana Police e-Challan System
@@ -28,14 +80,32 @@ class TelanganaPoliceAPI:
             'api_setu': 'https://apisetu.gov.in'
         }
         
+        # One Session shared by every upstream call so TCP/TLS connections are
+        # kept alive and reused; the sources are fanned out on _fetch_executor
         self.session = requests.Session()
+        # Larger connection pool for the concurrent fan-out, plus retries with
+        # backoff for rate limiting and transient upstream errors
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=100, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         
-        # Cache for reducing API calls
-        self.cache = {}
+        # Cache for reducing API calls (bounded, entries expire automatically)
         self.cache_expiry = 300  # 5 minutes
+        # Entries are (cached_at, data) and expire cache_expiry seconds after cached_at
+        # (wall clock, so entries restored by load_cache keep their original expiry)
+        self.cache = TLRUCache(maxsize=10_000, ttu=self._cache_ttu, timer=time.time)
+        self._cache_lock = threading.Lock()  # TTLCache is not thread-safe
+        
+        # Memoized challan lookups (see _lookup_challan)
+        self._challan_cache = TTLCache(maxsize=1024, ttl=self.cache_expiry)
+        self._challan_lock = threading.Lock()
+        
+        # Dedicated RNG for demo data instead of the shared module-level one
+        self._rng = random.Random()
     
     def search_vehicle_challans(self, vehicle_number: str) -> List[Dict[str, Any]]:
         """
@@ -53,45 +123,41 @@ class TelanganaPoliceAPI:
             
             # Check cache first
             cache_key = f"vehicle_{vehicle_number}"
-            if self._is_cache_valid(cache_key):
+            cached = self._cache_get(cache_key)
+            if cached is not None:
                 logger.info(f"Returning cached data for vehicle {vehicle_number}")
-                return self.cache[cache_key]['data']
-            
-            # Try multiple sources
-            results = []
+                return cached
             
-            # Method 1: Telangana Police Portal
-            try:
-                ts_results = self._fetch_from_telangana_portal(vehicle_number)
-                results.extend(ts_results)
-                logger.info(f"Found {len(ts_results)} records from Telangana Police portal")
-            except Exception as e:
-                logger.warning(f"Telangana Police portal failed: {e}")
+            # Query all sources concurrently; latency is the slowest source, not the sum
+            sources = [
+                ("Telangana Police portal", self._fetch_from_telangana_portal),
+                ("Parivahan portal", self._fetch_from_parivahan),
+                ("third-party APIs", self._fetch_from_third_party_apis)
+            ]
+            futures = {
+                _fetch_executor.submit(method, vehicle_number): source_name
+                for source_name, method in sources
+            }
             
-            # Method 2: National Parivahan Portal
-            try:
-                parivahan_results = self._fetch_from_parivahan(vehicle_number)
-                results.extend(parivahan_results)
-                logger.info(f"Found {len(parivahan_results)} records from Parivahan portal")
-            except Exception as e:
-                logger.warning(f"Parivahan portal failed: {e}")
+            source_results = {}
+            for future in as_completed(futures):
+                source_name = futures[future]
+                try:
+                    source_results[source_name] = future.result()
+                    logger.info(f"Found {len(source_results[source_name])} records from {source_name}")
+                except Exception as e:
+                    logger.warning(f"{source_name} failed: {e}")
             
-            # Method 3: Third-party APIs (if available)
-            try:
-                third_party_results = self._fetch_from_third_party_apis(vehicle_number)
-                results.extend(third_party_results)
-                logger.info(f"Found {len(third_party_results)} records from third-party APIs")
-            except Exception as e:
-                logger.warning(f"Third-party APIs failed: {e}")
+            # Merge in source priority order so deduplication keeps the preferred record
+            results = []
+            for source_name, _ in sources:
+                results.extend(source_results.get(source_name, []))
             
             # Deduplicate results based on challan number
             results = self._deduplicate_challans(results)
             
             # Cache the results
-            self.cache[cache_key] = {
-                'data': results,
-                'timestamp': datetime.now()
-            }
+            self._cache_set(cache_key, results)
             
             logger.info(f"Total unique challans found for {vehicle_number}: {len(results)}")
             return results
@@ -111,35 +177,42 @@ class TelanganaPoliceAPI:
             Challan details or None if not found
         """
         try:
-            cache_key = f"challan_{challan_number}"
-            if self._is_cache_valid(cache_key):
-                return self.cache[cache_key]['data']
-            
-            # Try multiple sources
-            for method_name, method in [
-                ("Telangana Police", self._fetch_challan_from_telangana),
-                ("Parivahan", self._fetch_challan_from_parivahan),
-                ("Third-party", self._fetch_challan_from_third_party)
-            ]:
-                try:
-                    result = method(challan_number)
-                    if result:
-                        # Cache the result
-                        self.cache[cache_key] = {
-                            'data': result,
-                            'timestamp': datetime.now()
-                        }
-                        logger.info(f"Found challan {challan_number} via {method_name}")
-                        return result
-                except Exception as e:
-                    logger.warning(f"{method_name} failed for challan {challan_number}: {e}")
-            
+            return self._lookup_challan(challan_number)
+        except LookupError:
             return None
-            
         except Exception as e:
             logger.error(f"Error searching challan: {e}")
             return None
     
+    @cachedmethod(lambda self: self._challan_cache, lock=lambda self: self._challan_lock)
+    def _lookup_challan(self, challan_number: str) -> Dict[str, Any]:
+        """Query every source for a challan; raises LookupError (not cached) if none has it"""
+        # Query all sources concurrently, then take the first hit in priority order
+        sources = [
+            ("Telangana Police", self._fetch_challan_from_telangana),
+            ("Parivahan", self._fetch_challan_from_parivahan),
+            ("Third-party", self._fetch_challan_from_third_party)
+        ]
+        futures = [
+            (method_name, _fetch_executor.submit(method, challan_number))
+            for method_name, method in sources
+        ]
+        
+        for method_name, future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"{method_name} failed for challan {challan_number}: {e}")
+                continue
+            if result:
+                # Lower-priority lookups are no longer needed
+                for _, pending in futures:
+                    pending.cancel()
+                logger.info(f"Found challan {challan_number} via {method_name}")
+                return result
+        
+        raise LookupError(challan_number)
+    
     def get_all_recent_challans(self, days_back: int = 30) -> List[Dict[str, Any]]:
         """
         Get all recent challans from the system (if supported by API)
@@ -151,13 +224,26 @@ class TelanganaPoliceAPI:
             List of recent challans
         """
         try:
-            # This would typically require admin access or special API permissions
-            # For now, return demo data structure
-            return self._get_demo_recent_challans(days_back)
+            # Query each day concurrently instead of walking the range one day at a time
+            # (demo data stops at _DEMO_RECENT_DAYS; drop the cap for a real source)
+            today = datetime.now()
+            days = [today - timedelta(days=i) for i in range(min(days_back, _DEMO_RECENT_DAYS))]
+            # Demo fields for every day are drawn in one batch up front
+            demo_challans = self._get_demo_recent_challans(days)
+            per_day = _day_executor.map(self._fetch_day, days, demo_challans)
+            
+            results = [challan for day_challans in per_day for challan in day_challans]
+            return self._deduplicate_challans(results)
         except Exception as e:
             logger.error(f"Error fetching recent challans: {e}")
             return []
     
+    def _fetch_day(self, day: datetime, demo_challan: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fetch all challans issued on a single day"""
+        # This would typically require admin access or special API permissions
+        # For now, return the day's demo challan
+        return [demo_challan]
+    
     def _fetch_from_telangana_portal(self, vehicle_number: str) -> List[Dict[str, Any]]:
         """Fetch data from Telangana Police portal"""
         url = f"{self.base_urls['telangana_police']}/publicview/"
@@ -202,68 +288,106 @@ class TelanganaPoliceAPI:
     def _normalize_vehicle_number(self, vehicle_number: str) -> str:
         """Normalize vehicle number format"""
         # Remove spaces and convert to uppercase
-        normalized = re.sub(r'\s+', '', vehicle_number.upper())
+        normalized = ''.join(vehicle_number.upper().split())
         
         # Validate format (basic Indian vehicle number pattern)
-        if not re.match(r'^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$', normalized):
+        if not _PLATE_RE.match(normalized):
             logger.warning(f"Invalid vehicle number format: {vehicle_number}")
         
         return normalized
     
-    def _is_cache_valid(self, key: str) -> bool:
-        """Check if cached data is still valid"""
-        if key not in self.cache:
-            return False
-        
-        cache_time = self.cache[key]['timestamp']
-        return (datetime.now() - cache_time).seconds < self.cache_expiry
+    def _cache_ttu(self, key: str, entry: tuple, now: float) -> float:
+        """Expiry time of a cache entry: cache_expiry seconds after it was cached"""
+        return entry[0] + self.cache_expiry
+    
+    def _cache_get(self, key: str) -> Any:
+        """Return cached data, or None if missing or expired"""
+        with self._cache_lock:
+            try:
+                return self.cache[key][1]
+            except KeyError:
+                return None
+    
+    def _cache_set(self, key: str, data: Any) -> None:
+        """Cache data for cache_expiry seconds"""
+        with self._cache_lock:
+            self.cache[key] = (time.time(), data)
+    
+    def save_cache(self, path: str) -> None:
+        """Write the current cache entries, with the time each was cached, to path as JSON"""
+        with self._cache_lock:
+            data = _dump({key: list(entry) for key, entry in self.cache.items()})
+        # Several processes may save to the same file: write a private temp file
+        # and rename it over path, so readers never see a partial or mixed file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.challan_cache.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def load_cache(self, path: str) -> None:
+        """Load cache entries saved by save_cache, skipping any that have expired since"""
+        try:
+            with open(path, 'rb') as f:
+                entries = _load(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load challan cache from {path}: {e}")
+            return
+        now = time.time()
+        with self._cache_lock:
+            for key, (cached_at, data) in entries.items():
+                if cached_at + self.cache_expiry > now:
+                    self.cache[key] = (cached_at, data)
     
     def _deduplicate_challans(self, challans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate challans based on challan number"""
-        seen = set()
-        unique_challans = []
-        
+        """Remove duplicate challans based on challan number (first occurrence wins)"""
+        unique_challans = {}
         for challan in challans:
-            challan_id = challan.get('challan_number', '')
-            if challan_id and challan_id not in seen:
-                seen.add(challan_id)
-                unique_challans.append(challan)
-        
-        return unique_challans
+            challan_id = challan.get('challan_number')
+            if challan_id:
+                unique_challans.setdefault(challan_id, challan)
+        return list(unique_challans.values())
     
     def _generate_demo_challans(self, vehicle_number: str, source: str) -> List[Dict[str, Any]]:
         """Generate demo challan data for testing"""
         challans = []
         
-        # Generate 2-5 demo challans per source
-        import random
-        num_challans = random.randint(1, 3) if vehicle_number else 0
+        # Generate 1-3 demo challans per source
+        num_challans = self._rng.randint(1, 3) if vehicle_number else 0
         
-        violations = [
-            {'type': 'Over Speeding', 'fine': 1000, 'section': 'MV Act 184'},
-            {'type': 'No Helmet', 'fine': 1000, 'section': 'MV Act 129'},
-            {'type': 'Signal Jump', 'fine': 5000, 'section': 'MV Act 177'},
-            {'type': 'Wrong Side Driving', 'fine': 5000, 'section': 'MV Act 184'},
-            {'type': 'Mobile Phone Usage', 'fine': 5000, 'section': 'MV Act 184'},
-        ]
+        # Draw every random field for all challans up front
+        n = num_challans
+        drawn = zip(
+            self._rng.choices(_VIOLATIONS, k=n),
+            self._rng.choices(range(1, 91), k=n),          # days ago
+            self._rng.choices(range(1000, 10000), k=n),    # serial
+            self._rng.choices(range(8, 21), k=n),          # hour
+            self._rng.choices(range(60), k=n),             # minute
+            self._rng.choices(range(1, 51), k=n),          # traffic post
+            self._rng.choices(string.ascii_uppercase, k=n),  # officer initial
+            self._rng.choices(_PAY_STATUS, k=n),
+        )
         
-        for i in range(num_challans):
-            violation = random.choice(violations)
-            challan_date = datetime.now() - timedelta(days=random.randint(1, 90))
+        now = datetime.now()
+        for violation, days_ago, serial, hour, minute, post, initial, status in drawn:
+            challan_date = now - timedelta(days=days_ago)
             
             challan = {
-                'challan_number': f"{source.upper()[:2]}{challan_date.strftime('%Y%m%d')}{random.randint(1000, 9999)}",
+                'challan_number': f"{source.upper()[:2]}{challan_date.strftime('%Y%m%d')}{serial}",
                 'vehicle_number': vehicle_number,
                 'violation_type': violation['type'],
                 'fine_amount': violation['fine'],
                 'challan_date': challan_date.strftime('%Y-%m-%d'),
-                'challan_time': f"{random.randint(8, 20):02d}:{random.randint(0, 59):02d}",
-                'location': f"Traffic Post {random.randint(1, 50)}, Hyderabad",
-                'officer_name': f"Inspector {chr(65 + random.randint(0, 25))}. Kumar",
+                'challan_time': f"{hour:02d}:{minute:02d}",
+                'location': f"Traffic Post {post}, Hyderabad",
+                'officer_name': f"Inspector {initial}. Kumar",
                 'section': violation['section'],
                 'court': 'Metropolitan Magistrate Court, Hyderabad',
                 'last_date': (challan_date + timedelta(days=30)).strftime('%Y-%m-%d'),
-                'payment_status': random.choice(['Paid', 'Unpaid', 'Pending']),
+                'payment_status': status,
                 'source': source,
                 'created_at': challan_date.isoformat(),
                 'is_telangana_police': True
@@ -275,12 +399,7 @@ class TelanganaPoliceAPI:
     
     def _generate_demo_challan_detail(self, challan_number: str, source: str) -> Dict[str, Any]:
         """Generate detailed demo challan data"""
-        violations = [
-            {'type': 'Over Speeding', 'fine': 1000, 'section': 'MV Act 184'},
-            {'type': 'No Helmet', 'fine': 1000, 'section': 'MV Act 129'},
-        ]
-        
-        violation = violations[0]  # Use first violation for consistency
+        violation = _VIOLATIONS[0]  # Use first violation for consistency
         challan_date = datetime.now() - timedelta(days=15)
         
         return {
@@ -308,34 +427,58 @@ class TelanganaPoliceAPI:
             }
         }
     
-    def _get_demo_recent_challans(self, days_back: int) -> List[Dict[str, Any]]:
-        """Get demo recent challans"""
-        recent_challans = []
+    def _get_demo_recent_challans(self, dates: List[datetime]) -> List[Dict[str, Any]]:
+        """Generate one demo recent challan per date, drawing each field in one batch"""
+        n = len(dates)
+        rng = self._rng
+        drawn = zip(
+            dates,
+            rng.choices(range(10, 51), k=n),          # district code
+            rng.choices(_PLATE_LETTERS, k=n),
+            rng.choices(range(1000, 10000), k=n),     # plate number
+            rng.choices(range(1000, 10000), k=n),     # challan serial
+            rng.choices(_RECENT_VIOLATION_TYPES, k=n),
+            rng.choices(_RECENT_FINES, k=n),
+            rng.choices(range(1, 21), k=n),           # area
+            rng.choices(_RECENT_PAY_STATUS, k=n),
+        )
         
-        # Generate some recent challans for demo
-        for i in range(10):  # Generate 10 recent challans
-            challan_date = datetime.now() - timedelta(days=i)
-            vehicle_num = f"TS{random.randint(10, 50):02d}{random.choice(['AB', 'CD', 'EF', 'GH'])}{random.randint(1000, 9999)}"
-            
-            challan = {
-                'challan_number': f"TS{challan_date.strftime('%Y%m%d')}{random.randint(1000, 9999)}",
-                'vehicle_number': vehicle_num,
-                'violation_type': random.choice(['Over Speeding', 'No Helmet', 'Signal Jump', 'Wrong Parking']),
-                'fine_amount': random.choice([500, 1000, 2000, 5000]),
+        return [
+            {
+                'challan_number': f"TS{challan_date.strftime('%Y%m%d')}{serial}",
+                'vehicle_number': f"TS{district:02d}{series}{plate_no}",
+                'violation_type': violation_type,
+                'fine_amount': fine,
                 'challan_date': challan_date.strftime('%Y-%m-%d'),
-                'location': f"Area {random.randint(1, 20)}, Hyderabad",
-                'payment_status': random.choice(['Paid', 'Unpaid']),
+                'location': f"Area {area}, Hyderabad",
+                'payment_status': status,
                 'source': 'recent_data',
                 'is_telangana_police': True
             }
-            
-            recent_challans.append(challan)
-        
-        return recent_challans
+            for challan_date, district, series, plate_no, serial, violation_type, fine, area, status in drawn
+        ]
+
+def _save_cache_at_exit(api: TelanganaPoliceAPI, path: str) -> None:
+    """atexit hook: persist the lookup cache, logging instead of raising on failure"""
+    try:
+        api.save_cache(path)
+    except (OSError, TypeError) as e:
+        logger.warning(f"Could not save challan cache to {path}: {e}")
 
 # Global instance for easy access
 telangana_api = TelanganaPoliceAPI()
 
+def persist_cache(path: str) -> None:
+    """
+    Keep telangana_api's lookup cache across restarts
+    
+    Loads the unexpired entries saved at path and saves the cache back there at
+    interpreter exit. Call once from application startup.
+    """
+    if os.path.exists(path):
+        telangana_api.load_cache(path)
+    atexit.register(_save_cache_at_exit, telangana_api, path)
+
 def get_vehicle_challans(vehicle_number: str) -> List[Dict[str, Any]]:
     """
     Simple function to get all challans for a vehicle
@@ -4,7 +4,10 @@ Trains on deteksi_pelanggran dataset from Roboflow
 """
 
 import os
+import shutil
 import sys
+import torch
+from pathlib import Path
 from ultralytics import YOLO
 from datetime import datetime
 
@@ -26,6 +29,14 @@ def train_custom_model():
     batch = 16   # Batch size (adjust based on memory)
     patience = 10  # Early stopping patience
     
+    # Prefer the first GPU (with mixed precision); fall back to all CPU cores
+    if torch.cuda.is_available():
+        device = 0
+        hardware_args = {'amp': True, 'workers': 8, 'cache': 'ram'}
+    else:
+        device = 'cpu'
+        hardware_args = {'workers': os.cpu_count(), 'cache': True}
+    
     # Check if data.yaml exists
     if not os.path.exists(data_yaml):
         print(f"❌ Error: {data_yaml} not found!")
@@ -49,6 +60,7 @@ def train_custom_model():
     print(f"   Image Size: {imgsz}x{imgsz}")
     print(f"   Batch Size: {batch}")
     print(f"   Early Stopping: {patience} epochs")
+    print(f"   Device: {'cuda:0 (AMP)' if device == 0 else 'cpu'}")
     
     print(f"\n🎯 Starting Training...")
     print("   This will take 30-60 minutes depending on hardware")
@@ -67,7 +79,8 @@ def train_custom_model():
             name=f"traffic_violations_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
             verbose=True,
             plots=True,  # Generate training plots
-            device='cpu',  # Use CPU (change to 'cuda' if GPU available)
+            device=device,
+            **hardware_args,
         )
         
         print("\n" + "=" * 80)
@@ -80,15 +93,30 @@ def train_custom_model():
         print(f"   Last Model Saved: {results.save_dir}/weights/last.pt")
         print(f"   Training Plots: {results.save_dir}/")
         
-        # Copy best model to main models directory
-        best_model_path = f"{results.save_dir}/weights/best.pt"
-        custom_model_path = "models/yolov8_custom_indonesian.pt"
+        # Move best model to main models directory (a rename on the same
+        # filesystem, so the target is never left half-written)
+        best_model_path = Path(results.save_dir) / 'weights' / 'best.pt'
+        custom_model_path = Path('models/yolov8_custom_indonesian.pt')
         
-        if os.path.exists(best_model_path):
-            import shutil
-            shutil.copy(best_model_path, custom_model_path)
-            print(f"\n✅ Custom model copied to: {custom_model_path}")
+        if best_model_path.exists():
+            custom_model_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(best_model_path, custom_model_path)
+            except OSError:
+                # Different filesystem: fall back to copy + delete
+                shutil.move(best_model_path, custom_model_path)
+            print(f"\n✅ Custom model moved to: {custom_model_path}")
             print(f"   This model is now ready to use in your detection system!")
+            
+            # Export an ONNX copy alongside the .pt for faster inference;
+            # FP16 export needs the model on the GPU, so export on the training device
+            try:
+                onnx_path = YOLO(custom_model_path).export(
+                    format='onnx', device=device, half=(device == 0), dynamic=True, simplify=True
+                )
+                print(f"✅ ONNX export saved to: {onnx_path}")
+            except Exception as e:
+                print(f"⚠️ ONNX export failed: {e}")
         
         print(f"\n🎯 Next Steps:")
         print(f"   1. Update detection system to use custom model")
@@ -4,36 +4,303 @@ Processes video files frame-by-frame for traffic violation detection
 """
 
 import cv2
+import multiprocessing
+from array import array
 import os
-import sys
-from typing import List, Dict, Any
+import queue
+import threading
+import numpy as np
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
+from itertools import islice
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from website.detect import DEFAULT_TILE, ViolationDetector
 
-from road_safety_violation_detector.website.detect import ViolationDetector
+# At or above this frame_skip, seeking to each sampled frame is cheaper than
+# decoding every frame in between (a seek decodes forward from the previous keyframe)
+SEEK_MIN_FRAME_SKIP = 120
+
+# Sampled frames sent to the detector per batched inference call
+DETECTION_BATCH_SIZE = 16
+
+# Decoded batches buffered ahead of the detector, so decoding overlaps inference
+DECODE_QUEUE_SIZE = 2
+
+# End-of-video marker on the decoded batch queue
+_DECODE_DONE = object()
+
+# Frames taller than this are detected tile by tile instead of downscaled whole
+TILE_MIN_HEIGHT = 1080
+
+# Codec for highlight videos
+_FOURCC_MP4V = cv2.VideoWriter_fourcc(*'mp4v')
+
+# GStreamer pipelines that decode H.264 MP4 with NVDEC (Jetson, then desktop GPUs).
+# OpenCV's FFmpeg backend ignores CUDA hwaccel options, so this is its GPU decode route.
+NVDEC_GST_PIPELINES = (
+    'filesrc location="{path}" ! qtdemux ! h264parse ! nvv4l2decoder ! nvvidconv ! '
+    'video/x-raw,format=BGRx ! videoconvert ! video/x-raw,format=BGR ! appsink',
+    'filesrc location="{path}" ! qtdemux ! h264parse ! nvh264dec ! '
+    'videoconvert ! video/x-raw,format=BGR ! appsink',
+)
+
+
+@lru_cache(maxsize=1)
+def _opencv_has_gstreamer() -> bool:
+    """Check whether this OpenCV build includes the GStreamer backend"""
+    for line in cv2.getBuildInformation().splitlines():
+        if line.strip().startswith('GStreamer:'):
+            return 'YES' in line
+    return False
+
+
+def open_video_capture(video_path: str) -> cv2.VideoCapture:
+    """
+    Open a video for decoding, preferring NVDEC through GStreamer
+    
+    Falls back to OpenCV's default (CPU FFmpeg) backend when OpenCV was built
+    without GStreamer or no hardware pipeline can open the file.
+    """
+    if _opencv_has_gstreamer():
+        for pipeline in NVDEC_GST_PIPELINES:
+            cap = cv2.VideoCapture(pipeline.format(path=video_path), cv2.CAP_GSTREAMER)
+            if cap.isOpened():
+                return cap
+            cap.release()
+    return cv2.VideoCapture(video_path)
+
+
+def _read_new_frame(cap):
+    """cap.read() into a newly allocated frame"""
+    return cap.read()
+
+
+class FramePool:
+    """
+    Preallocated BGR buffers that decoded frames are retrieved into, round robin
+    
+    Saves allocating a new full-size array for every decoded frame. A frame
+    read from the pool is overwritten len(pool) reads later, so callers must
+    never hold more frames than that at once; copy any frame kept longer.
+    """
+    
+    def __init__(self, height: int, width: int, size: int):
+        self._buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(size)]
+        self._next = 0
+    
+    def __len__(self) -> int:
+        return len(self._buffers)
+    
+    def read(self, cap):
+        """cap.read() into the next buffer (a new array only if the frame size differs)"""
+        buf = self._buffers[self._next]
+        self._next = (self._next + 1) % len(self._buffers)
+        if not cap.grab():
+            return False, None
+        return cap.retrieve(buf)
+
+
+def frame_pool_for(cap, size: int) -> Optional[FramePool]:
+    """FramePool matching an opened capture, or None if it cannot retrieve into buffers"""
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if not isinstance(cap, cv2.VideoCapture) or width <= 0 or height <= 0:
+        return None
+    return FramePool(height, width, size)
+
+
+def iter_sampled_frames(cap, frame_skip: int, total_frames: int = 0,
+                        frame_pool: Optional[FramePool] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (frame_index, frame) for every frame_skip-th frame of an opened capture
+    
+    Args:
+        cap: Opened cv2.VideoCapture (or compatible reader)
+        frame_skip (int): Sample every Nth frame, starting at frame 0
+        total_frames (int): Frame count reported by the container (0 if unknown)
+        frame_pool (FramePool): Buffers to decode into instead of new arrays;
+            yielded frames are then reused after len(frame_pool) more frames
+    """
+    read = frame_pool.read if frame_pool is not None else _read_new_frame
+    if frame_skip >= SEEK_MIN_FRAME_SKIP and total_frames > 0 and isinstance(cap, cv2.VideoCapture):
+        yield from _seek_sampled_frames(cap, frame_skip, total_frames, read)
+    else:
+        yield from _decode_sampled_frames(cap, frame_skip, 0, read)
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    """Write already-encoded file contents to path"""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+@lru_cache(maxsize=4096)
+def _format_hms(total_seconds: int) -> str:
+    """HH:MM:SS for a whole number of seconds (cached: samples repeat the same seconds)"""
+    hours, rem = divmod(total_seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+class _ViolationTimeline:
+    """
+    Violation frames stored as parallel columns instead of one dict per frame
+    
+    Dicts in the shape callers expect are built once, by to_list().
+    """
+    
+    def __init__(self):
+        self.frame_numbers = array('q')
+        self.timestamps_sec = array('d')
+        self.violation_counts = array('i')
+        self.violations: List[list] = []
+        self.counts: List[dict] = []
+        self.plate_numbers: List[list] = []
+        self.frame_paths: List[Optional[str]] = []
+    
+    def __len__(self) -> int:
+        return len(self.frame_numbers)
+    
+    def append(self, frame_number: int, timestamp_sec: float, violations: list,
+               counts: dict, plate_numbers: list, frame_path: Optional[str] = None) -> None:
+        self.frame_numbers.append(frame_number)
+        self.timestamps_sec.append(timestamp_sec)
+        self.violation_counts.append(len(violations))
+        self.violations.append(violations)
+        self.counts.append(counts)
+        self.plate_numbers.append(plate_numbers)
+        self.frame_paths.append(frame_path)
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Materialize the timeline as a list of per-frame dicts"""
+        timeline = []
+        for frame_number, timestamp_sec, violations, counts, plate_numbers, frame_path in zip(
+                self.frame_numbers, self.timestamps_sec, self.violations,
+                self.counts, self.plate_numbers, self.frame_paths):
+            violation_info = {
+                'frame_number': frame_number,
+                'timestamp': _format_hms(int(timestamp_sec)),
+                'timestamp_seconds': timestamp_sec,
+                'violations': violations,
+                'counts': counts,
+                'plate_numbers': plate_numbers
+            }
+            if frame_path is not None:
+                violation_info['frame_path'] = frame_path
+            timeline.append(violation_info)
+        return timeline
+
+
+def _merge_ranges(ranges) -> List[Tuple[int, int]]:
+    """Sort half-open (start, end) ranges and merge the ones that overlap or touch"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _batched(iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to size consecutive items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _put_unless_stopped(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Block until item is queued or stop is set; returns whether it was queued"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _decode_batches(sampled, batch_size: int, batches_q: queue.Queue, stop: threading.Event) -> None:
+    """
+    Producer thread for process_video: decode sampled frames into batches
+    
+    Ends the queue with _DECODE_DONE, or with the exception that stopped
+    decoding. Returns early without either once stop is set.
+    """
+    try:
+        for batch in _batched(sampled, batch_size):
+            if not _put_unless_stopped(batches_q, batch, stop):
+                return
+        end = _DECODE_DONE
+    except Exception as e:
+        end = e
+    _put_unless_stopped(batches_q, end, stop)
+
+
+def _seek_sampled_frames(cap, frame_skip: int, total_frames: int, read):
+    """Seek straight to each sampled frame so skipped frames are not decoded"""
+    next_idx = 0
+    for target in range(0, total_frames, frame_skip):
+        if not cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+            # Backend cannot seek: decode forward from the current position
+            yield from _decode_sampled_frames(cap, frame_skip, next_idx, read)
+            return
+        ret, frame = read(cap)
+        if not ret:
+            return
+        yield target, frame
+        next_idx = target + 1
+
+
+def _decode_sampled_frames(cap, frame_skip: int, frame_idx: int, read):
+    """Decode sequentially, keeping only every frame_skip-th frame"""
+    while True:
+        # grab() advances without the BGR conversion and array allocation of read()
+        if frame_idx % frame_skip != 0:
+            if not cap.grab():
+                break
+            frame_idx += 1
+            continue
+        ret, frame = read(cap)
+        if not ret:
+            break
+        yield frame_idx, frame
+        frame_idx += 1
 
 
 class VideoProcessor:
     """Process video files for violation detection"""
     
-    def __init__(self, frame_skip=30):
+    def __init__(self, frame_skip=30, detector=None):
         """
         Initialize video processor
         
         Args:
             frame_skip (int): Process every Nth frame (default: 30 = 1fps for 30fps video)
+            detector (ViolationDetector): Detector to share (default: load a new one)
         """
-        self.detector = ViolationDetector()
+        self.detector = detector if detector is not None else ViolationDetector()
         self.frame_skip = frame_skip
+        # Encodes and writes violation frames off the decode/detect loop
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='frame-writer')
     
-    def process_video(self, video_path: str, output_dir: str = None) -> Dict[str, Any]:
+    def process_video(self, video_path: str, output_dir: str = None,
+                      on_violation: Optional[Callable[[Any, list, int, float], None]] = None) -> Dict[str, Any]:
         """
         Process video file and detect violations
         
         Args:
             video_path (str): Path to video file
             output_dir (str): Directory to save output frames (optional)
+            on_violation (callable): Called as on_violation(frame, violations, frame_idx,
+                timestamp_sec) for each sampled frame with violations, so further work
+                (e.g. ViolationWorker.on_violation) shares this decode pass. The frame
+                buffer is reused afterwards; copy it to keep it.
             
         Returns:
             dict: Processing results including violations, frames, and metadata
@@ -42,7 +309,7 @@ class VideoProcessor:
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
         # Open video
-        cap = cv2.VideoCapture(video_path)
+        cap = self._open_capture(video_path)
         if not cap.isOpened():
             raise ValueError(f"Cannot open video file: {video_path}")
         
@@ -53,72 +320,111 @@ class VideoProcessor:
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         duration_seconds = total_frames / fps if fps > 0 else 0
         
-        print(f"📹 Processing video: {os.path.basename(video_path)}")
+        filename = os.path.basename(video_path)
+        print(f"📹 Processing video: {filename}")
         print(f"   Resolution: {width}x{height}")
         print(f"   FPS: {fps}")
         print(f"   Duration: {duration_seconds:.1f}s ({total_frames} frames)")
         print(f"   Sampling: Every {self.frame_skip} frames (~{fps/self.frame_skip:.1f} samples/sec)")
         
         # Process frames
-        violations_timeline = []
+        timeline = _ViolationTimeline()
         violation_frames = []
         frames_processed = 0
         total_violations = 0
+        pending_writes = []
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
         
-        frame_idx = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Skip frames based on frame_skip setting
-            if frame_idx % self.frame_skip != 0:
-                frame_idx += 1
-                continue
-            
-            # Calculate timestamp
-            timestamp_sec = frame_idx / fps if fps > 0 else frame_idx
-            timestamp_str = self._format_timestamp(timestamp_sec)
-            
-            # Run detection on this frame
-            result = self.detector.detect_violations(frame)
-            frames_processed += 1
-            
-            violations = result.get('violations', [])
-            if violations:
-                total_violations += len(violations)
+        # Annotated frames are only needed as JPEGs for output_dir; the detector
+        # encodes them directly, or skips drawing when nothing is saved
+        annotate = 'jpeg' if output_dir else False
+        tile = DEFAULT_TILE if height > TILE_MIN_HEIGHT else None
+        
+        # Every model input in this video has the same shape: the letterboxed
+        # frame, or a tile (already a model-sized input, so used as is)
+        if tile:
+            self.detector.specialize(tile[:2], letterbox=False)
+        else:
+            self.detector.specialize((height, width))
+        
+        # Detect on DETECTION_BATCH_SIZE sampled frames per model call. Frames are
+        # decoded into reusable buffers, so nothing may hold a frame past its batch:
+        # annotated output is already encoded to JPEG bytes, batch results carry
+        # no raw YOLO result (its orig_img would alias the buffer), and
+        # on_violation callers copy what they keep
+        #
+        # Decoding runs on a producer thread, DECODE_QUEUE_SIZE batches ahead. The
+        # pool holds a buffer for every frame in flight: the queued batches, the
+        # one being decoded and the one being detected
+        frame_pool = frame_pool_for(cap, DETECTION_BATCH_SIZE * (DECODE_QUEUE_SIZE + 2))
+        sampled = iter_sampled_frames(cap, self.frame_skip, total_frames, frame_pool)
+        batches_q = queue.Queue(maxsize=DECODE_QUEUE_SIZE)
+        stop_decoding = threading.Event()
+        decoder = threading.Thread(
+            target=_decode_batches, args=(sampled, DETECTION_BATCH_SIZE, batches_q, stop_decoding),
+            name='video-decoder', daemon=True
+        )
+        decoder.start()
+        try:
+            while True:
+                batch = batches_q.get()
+                if batch is _DECODE_DONE:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                frame_idxs = [frame_idx for frame_idx, _ in batch]
+                frames = [frame for _, frame in batch]
+                results = self.detector.detect_violations_batch(frames, annotate=annotate, tile=tile)
+                frames_processed += len(batch)
                 
-                # Save violation frame info
-                violation_info = {
-                    'frame_number': frame_idx,
-                    'timestamp': timestamp_str,
-                    'timestamp_seconds': timestamp_sec,
-                    'violations': violations,
-                    'counts': result.get('counts', {}),
-                    'plate_numbers': result.get('plate_numbers', [])
-                }
-                violations_timeline.append(violation_info)
+                # Timestamps for the whole batch in one vectorized step
+                timestamps = np.asarray(frame_idxs, dtype=np.float64)
+                if fps > 0:
+                    timestamps /= fps
                 
-                # Save annotated frame if output directory specified
-                if output_dir:
-                    os.makedirs(output_dir, exist_ok=True)
-                    annotated_frame = result.get('annotated_image')
-                    if annotated_frame is not None:
-                        frame_filename = f"violation_frame_{frame_idx:06d}_{timestamp_str.replace(':', '-')}.jpg"
-                        frame_path = os.path.join(output_dir, frame_filename)
-                        cv2.imwrite(frame_path, annotated_frame)
-                        violation_info['frame_path'] = frame_path
-                        violation_frames.append(frame_path)
-            
-            frame_idx += 1
+                for frame_idx, frame, timestamp_sec, result in zip(frame_idxs, frames, timestamps.tolist(), results):
+                    violations = result.get('violations', [])
+                    if violations:
+                        total_violations += len(violations)
+                        if on_violation is not None:
+                            on_violation(frame, violations, frame_idx, timestamp_sec)
+                        
+                        # Save annotated frame if output directory specified
+                        frame_path = None
+                        if output_dir:
+                            annotated_jpeg = result.get('annotated_jpeg')
+                            if annotated_jpeg is not None:
+                                # Only violation frames need a formatted timestamp
+                                timestamp_str = self._format_timestamp(timestamp_sec)
+                                frame_filename = f"violation_frame_{frame_idx:06d}_{timestamp_str.replace(':', '-')}.jpg"
+                                frame_path = os.path.join(output_dir, frame_filename)
+                                pending_writes.append(self._io_pool.submit(_write_bytes, frame_path, annotated_jpeg))
+                                violation_frames.append(frame_path)
+                        
+                        # Save violation frame info
+                        timeline.append(
+                            frame_idx, timestamp_sec, violations,
+                            result.get('counts', {}), result.get('plate_numbers', []), frame_path
+                        )
+        finally:
+            # The capture must not be released while the decoder still reads it
+            stop_decoding.set()
+            decoder.join()
+            # The detector is shared; do not leak this video's input shape to other callers
+            self.detector.specialize(None)
         
         cap.release()
         
+        # Frame paths in the summary must exist when we return
+        wait(pending_writes)
+        
         # Generate summary
+        violations_timeline = timeline.to_list()
         summary = {
             'video_path': video_path,
             'video_info': {
-                'filename': os.path.basename(video_path),
+                'filename': filename,
                 'resolution': f'{width}x{height}',
                 'fps': fps,
                 'total_frames': total_frames,
@@ -144,12 +450,13 @@ class VideoProcessor:
         
         return summary
     
+    def _open_capture(self, video_path: str):
+        """Open a decoder for video_path (GStreamer NVDEC if available, else CPU)"""
+        return open_video_capture(video_path)
+    
     def _format_timestamp(self, seconds: float) -> str:
         """Format seconds to HH:MM:SS format"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+        return _format_hms(int(seconds))
     
     def create_highlight_video(self, video_path: str, violations_timeline: List[Dict], 
                                output_path: str, before_sec: int = 2, after_sec: int = 2):
@@ -176,23 +483,29 @@ class VideoProcessor:
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
         # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        out = cv2.VideoWriter(output_path, _FOURCC_MP4V, fps, (width, height))
         
-        for violation in violations_timeline:
-            frame_num = violation['frame_number']
-            start_frame = max(0, frame_num - before_sec * fps)
-            end_frame = frame_num + after_sec * fps
-            
-            # Seek to start frame
-            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-            
-            # Write frames
-            for _ in range(int(end_frame - start_frame)):
+        # Merge overlapping windows so shared frames are decoded and written once
+        ranges = _merge_ranges(
+            (max(0, violation['frame_number'] - before_sec * fps), violation['frame_number'] + after_sec * fps)
+            for violation in violations_timeline
+        )
+        
+        # Single forward pass: write frames inside a window, grab() past the rest
+        frame_idx = 0
+        ended = False
+        for start_frame, end_frame in ranges:
+            while frame_idx < start_frame and not ended:
+                ended = not cap.grab()
+                frame_idx += 1
+            while frame_idx < end_frame and not ended:
                 ret, frame = cap.read()
-                if not ret:
-                    break
-                out.write(frame)
+                ended = not ret
+                if ret:
+                    out.write(frame)
+                frame_idx += 1
+            if ended:
+                break
         
         cap.release()
         out.release()
@@ -201,7 +514,71 @@ class VideoProcessor:
         return output_path
 
 
-def process_video_file(video_path: str, output_dir: str = None, frame_skip: int = 30) -> Dict[str, Any]:
+class _NvdecCapture:
+    """cv2.VideoCapture-like wrapper around an ffmpegcv NVDEC reader"""
+    
+    def __init__(self, reader):
+        self.reader = reader
+        self._props = {
+            cv2.CAP_PROP_FPS: reader.fps,
+            cv2.CAP_PROP_FRAME_COUNT: reader.count,
+            cv2.CAP_PROP_FRAME_WIDTH: reader.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: reader.height,
+        }
+    
+    def isOpened(self) -> bool:
+        return True
+    
+    def get(self, prop_id: int) -> float:
+        return float(self._props.get(prop_id, 0))
+    
+    def read(self):
+        return self.reader.read()
+    
+    def grab(self) -> bool:
+        # ffmpegcv has no separate grab step; the frame is decoded and dropped
+        ret, _ = self.reader.read()
+        return ret
+    
+    def release(self):
+        self.reader.release()
+
+
+class GpuVideoProcessor(VideoProcessor):
+    """
+    VideoProcessor that decodes on the GPU with NVDEC (via ffmpegcv)
+    
+    OpenCV's FFmpeg backend ignores CUDA hwaccel settings, so frames are decoded
+    by NVDEC and only the converted BGR frame is copied to host memory for the
+    detector. Falls back to open_video_capture if ffmpegcv or NVDEC is unavailable.
+    """
+    
+    def __init__(self, frame_skip=30, gpu_id=0):
+        """
+        Initialize GPU video processor
+        
+        Args:
+            frame_skip (int): Process every Nth frame
+            gpu_id (int): Index of the GPU whose NVDEC engine decodes the video
+        """
+        super().__init__(frame_skip=frame_skip)
+        self.gpu_id = gpu_id
+    
+    def _open_capture(self, video_path: str):
+        """Open an NVDEC decoder, or the default decoder if that fails"""
+        try:
+            import ffmpegcv
+            reader = ffmpegcv.VideoCaptureNV(video_path, pix_fmt='bgr24', gpu=self.gpu_id)
+            return _NvdecCapture(reader)
+        except ImportError:
+            print("⚠️ ffmpegcv not available, using the default decoder")
+        except Exception as e:
+            print(f"⚠️ NVDEC decode unavailable ({e}), using the default decoder")
+        return super()._open_capture(video_path)
+
+
+def process_video_file(video_path: str, output_dir: str = None, frame_skip: int = 30,
+                       gpu_decode: bool = False) -> Dict[str, Any]:
     """
     Convenience function to process a video file
     
@@ -209,9 +586,95 @@ def process_video_file(video_path: str, output_dir: str = None, frame_skip: int
         video_path (str): Path to video file
         output_dir (str): Directory to save output frames
         frame_skip (int): Process every Nth frame
+        gpu_decode (bool): Decode with NVDEC on the GPU instead of the CPU
         
     Returns:
         dict: Processing results
     """
-    processor = VideoProcessor(frame_skip=frame_skip)
+    processor_cls = GpuVideoProcessor if gpu_decode else VideoProcessor
+    processor = processor_cls(frame_skip=frame_skip)
     return processor.process_video(video_path, output_dir)
+
+
+# Per-process VideoProcessor used by process_videos workers (model loaded once per process)
+_worker_processor = None
+
+
+def _init_video_worker(frame_skip: int, gpu_decode: bool, gpu_ids) -> None:
+    """Set up a process_videos worker: one thread per library, own GPU, own model"""
+    global _worker_processor
+    # Workers already run in parallel; avoid oversubscribing cores with inner thread pools
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+    cv2.setNumThreads(1)
+    if gpu_ids is not None:
+        # Give each worker its own GPU (and NVDEC context)
+        os.environ['CUDA_VISIBLE_DEVICES'] = str(gpu_ids.get())
+    processor_cls = GpuVideoProcessor if gpu_decode else VideoProcessor
+    _worker_processor = processor_cls(frame_skip=frame_skip)
+
+
+def _process_video_in_worker(video_path: str, output_dir: Optional[str]) -> Dict[str, Any]:
+    """Run the worker's VideoProcessor on one video"""
+    return _worker_processor.process_video(video_path, output_dir)
+
+
+def _gpu_count() -> int:
+    """Number of visible CUDA devices (0 if torch is unavailable)"""
+    try:
+        import torch
+        return torch.cuda.device_count()
+    except ImportError:
+        return 0
+
+
+def process_videos(video_paths: List[str], output_dir: str = None, frame_skip: int = 30,
+                   gpu_decode: bool = False, max_workers: int = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Process several video files in parallel worker processes
+    
+    Args:
+        video_paths (list): Paths to video files
+        output_dir (str): Directory for output frames; each video gets a subdirectory
+        frame_skip (int): Process every Nth frame
+        gpu_decode (bool): Decode with NVDEC, one worker per GPU
+        max_workers (int): Worker processes (default: one per GPU, or one per 4 CPU cores)
+        
+    Returns:
+        list: Processing results for each video in input order (None if it failed)
+    """
+    if not video_paths:
+        return []
+    
+    gpu_count = _gpu_count() if gpu_decode else 0
+    if max_workers is None:
+        max_workers = gpu_count or max(1, (os.cpu_count() or 1) // 4)
+    max_workers = min(max_workers, len(video_paths))
+    
+    # Spawn, not fork: CUDA cannot be used in a forked child of a CUDA-initialized parent
+    ctx = multiprocessing.get_context('spawn')
+    gpu_ids = None
+    if gpu_count:
+        gpu_ids = ctx.Queue()
+        for i in range(max_workers):
+            gpu_ids.put(i % gpu_count)
+    
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx,
+                             initializer=_init_video_worker,
+                             initargs=(frame_skip, gpu_decode, gpu_ids)) as executor:
+        futures = []
+        for video_path in video_paths:
+            video_output_dir = None
+            if output_dir:
+                video_name = os.path.splitext(os.path.basename(video_path))[0]
+                video_output_dir = os.path.join(output_dir, video_name)
+            futures.append(executor.submit(_process_video_in_worker, video_path, video_output_dir))
+        
+        results = []
+        for video_path, future in zip(video_paths, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"❌ Failed to process {video_path}: {e}")
+                results.append(None)
+    
+    return results
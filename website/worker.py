@@ -3,27 +3,52 @@ Worker script for processing videos and detecting violations
 Processes video frames, detects violations, reads plates, and generates reports
 """
 
-import sys
 import os
+import queue
+import threading
+import warnings
 import cv2
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from configs.config import SAMPLE_VIDEO_PATH, FRAME_SKIP, VIOLATIONS_STORAGE
-from road_safety_violation_detector.website.detect import ViolationDetector
-from road_safety_violation_detector.website.plate_reader import PlateReader
-from road_safety_violation_detector.website.rules import compute_fine
-from road_safety_violation_detector.website.pdf_generator import build_pdf
-from db.models import DatabaseManager
+from configs.config import DATABASE_PATH, SAMPLE_VIDEO_PATH, FRAME_SKIP, VIOLATIONS_STORAGE
+from website.detect import ViolationDetector
+from website.plate_reader import get_plate_reader
+from website.rules import compute_fine
+from website.pdf_generator import build_pdf
+from website.video_processor import VideoProcessor
+from website.database import DatabaseManager
+
+# Items buffered between pipeline stages; bounds memory held by in-flight frames
+PIPELINE_QUEUE_SIZE = 4
+
+# Plate crops read per batched OCR call
+OCR_BATCH = 8
+
+# Violations inserted per database transaction
+DB_INSERT_BATCH = 64
+
+# End-of-stream marker passed down the pipeline
+_STOP = object()
 
 class ViolationWorker:
     """Main worker class for processing videos and detecting violations"""
     
     def __init__(self):
         self.detector = ViolationDetector()
-        self.plate_reader = PlateReader()
+        self.video_processor = VideoProcessor(frame_skip=FRAME_SKIP, detector=self.detector)
+        # Shared GPU reader, so batched OCR runs on the GPU with the same weights as the detector
+        self.plate_reader = get_plate_reader()
         self.db = DatabaseManager(DATABASE_PATH)
         
+        # Snapshot writes and PDF rendering run off the recording loop
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='snapshot-writer')
+        self._pdf_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='echallan-pdf')
+        
+        # Plate reading/recording stages of the video being processed (see on_violation)
+        self._pipeline = None
+        
         # Ensure storage directories exist
         os.makedirs(VIOLATIONS_STORAGE, exist_ok=True)
     
@@ -31,57 +56,169 @@ class ViolationWorker:
         """
         Process a video file for violations
         
+        Deprecated: decode the video once with VideoProcessor.process_video(...,
+        on_violation=worker.on_violation) and collect the results with
+        worker.finish_violations(); this method is now a wrapper around that.
+        
         Args:
             video_path (str): Path to video file
             
         Returns:
             list: List of processed violations
         """
+        warnings.warn(
+            "ViolationWorker.process_video is deprecated; pass on_violation=worker.on_violation "
+            "to VideoProcessor.process_video and call worker.finish_violations()",
+            DeprecationWarning, stacklevel=2
+        )
+        return self._process_video(video_path)
+    
+    def _process_video(self, video_path):
+        """Detect, plate read and record violations in a video in one decode pass"""
         if not os.path.exists(video_path):
             print(f"Video file not found: {video_path}")
             return []
         
-        violations_found = []
-        
-        # Open video
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"Could not open video: {video_path}")
-            return []
+        try:
+            self.video_processor.process_video(video_path, on_violation=self.on_violation)
+        except ValueError as e:
+            print(f"Could not open video: {e}")
+        finally:
+            violations_found = self.finish_violations()
+        return violations_found
+    
+    def on_violation(self, frame, detections, frame_number, timestamp):
+        """
+        VideoProcessor.process_video callback for a sampled frame with violations
         
-        frame_count = 0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        Plate reading and recording (fine, snapshot, DB, PDF) run in background
+        stages connected by bounded queues, so they overlap with decoding and
+        detection. Call finish_violations() once the video is done.
         
-        print(f"Processing video: {video_path}")
-        print(f"Total frames: {total_frames}, FPS: {fps}")
-        print(f"Processing every {FRAME_SKIP} frames...")
+        Args:
+            frame (numpy.ndarray): Video frame (copied; the caller reuses its buffer)
+            detections (list): Violations detected in the frame
+            frame_number (int): Frame number
+            timestamp (float): Timestamp in video
+        """
+        if self._pipeline is None:
+            self._pipeline = self._start_pipeline()
+        detections_q = self._pipeline[0]
+        print(f"Processing frame {frame_number} (time: {timestamp:.1f}s)")
+        detections_q.put((frame_number, timestamp, frame.copy(), detections))
+    
+    def finish_violations(self):
+        """
+        Wait for the violations passed to on_violation to be recorded
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
+        Returns:
+            list: Processed violations, with their e-challan PDF paths
             
-            # Process every Nth frame
-            if frame_count % FRAME_SKIP == 0:
-                timestamp = frame_count / fps
-                print(f"Processing frame {frame_count} (time: {timestamp:.1f}s)")
-                
-                # Detect violations in this frame
-                detections = self.detector.detect_violations(frame)
-                
-                for detection in detections:
-                    violation = self.process_violation(frame, detection, frame_count, timestamp)
-                    if violation:
-                        violations_found.append(violation)
+        Raises:
+            Exception: The error that stopped a pipeline stage, if any
+        """
+        if self._pipeline is None:
+            return []
+        detections_q, stages, committed, errors = self._pipeline
+        self._pipeline = None
+        
+        detections_q.put(_STOP)
+        for thread in stages:
+            thread.join()
+        if errors:
+            raise errors[0]
         
-        cap.release()
+        violations_found = [self._finish_pdf(violation, pdf_future) for violation, pdf_future in committed]
         
         print(f"Video processing complete. Found {len(violations_found)} violations.")
         return violations_found
     
+    def _start_pipeline(self):
+        """Start the plate reading and recording stages for one video"""
+        detections_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        records_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        committed = []
+        errors = []
+        stages = [
+            threading.Thread(target=self._plate_stage, args=(detections_q, records_q, errors),
+                             name="violation-plate_stage", daemon=True),
+            threading.Thread(target=self._record_stage, args=(records_q, committed, errors),
+                             name="violation-record_stage", daemon=True),
+        ]
+        for thread in stages:
+            thread.start()
+        return detections_q, stages, committed, errors
+    
+    @staticmethod
+    def _drain(q):
+        """Discard queued items up to _STOP so a failed stage never blocks its producer"""
+        while q.get() is not _STOP:
+            pass
+    
+    def _plate_stage(self, detections_q, records_q, errors):
+        """Read plates for queued detections, up to OCR_BATCH plates per OCR call"""
+        pending = []
+        
+        def flush():
+            try:
+                vehicle_nos = self._read_violation_plates(
+                    [(frame, detection) for frame, detection, _, _ in pending]
+                )
+                for (frame, detection, frame_count, timestamp), vehicle_no in zip(pending, vehicle_nos):
+                    if vehicle_no:
+                        records_q.put((frame, detection, vehicle_no, frame_count, timestamp))
+            except Exception as e:
+                print(f"Error reading plates for {len(pending)} violations: {e}")
+            pending.clear()
+        
+        try:
+            while True:
+                item = detections_q.get()
+                if item is _STOP:
+                    break
+                frame_count, timestamp, frame, detections = item
+                pending.extend((frame, detection, frame_count, timestamp) for detection in detections)
+                if len(pending) >= OCR_BATCH:
+                    flush()
+            if pending:
+                flush()
+        except Exception as e:
+            print(f"Plate reading stage failed: {e}")
+            errors.append(e)
+            self._drain(detections_q)
+        finally:
+            records_q.put(_STOP)
+    
+    def _record_stage(self, records_q, committed, errors):
+        """Record violations with read plates, DB_INSERT_BATCH per database transaction"""
+        pending = []
+        pending_counts = Counter()
+        
+        def flush():
+            try:
+                committed.extend(self._commit_violations(pending))
+            except Exception as e:
+                print(f"Error recording {len(pending)} violations: {e}")
+            pending.clear()
+            pending_counts.clear()
+        
+        try:
+            while True:
+                item = records_q.get()
+                if item is _STOP:
+                    break
+                result = self._record_violation(*item, pending_counts=pending_counts)
+                if result:
+                    pending.append(result)
+                if len(pending) >= DB_INSERT_BATCH:
+                    flush()
+            if pending:
+                flush()
+        except Exception as e:
+            print(f"Violation recording stage failed: {e}")
+            errors.append(e)
+            self._drain(records_q)
+    
     def process_violation(self, frame, detection, frame_number, timestamp):
         """
         Process a single violation detection
@@ -95,27 +232,92 @@ class ViolationWorker:
         Returns:
             dict: Processed violation data
         """
+        vehicle_no = self._read_violation_plate(frame, detection)
+        if vehicle_no is None:
+            return None
+        result = self._record_violation(frame, detection, vehicle_no, frame_number, timestamp)
+        if result is None:
+            return None
+        committed = self._commit_violations([result])
+        return self._finish_pdf(*committed[0]) if committed else None
+    
+    def _read_violation_plate(self, frame, detection):
+        """
+        Read the number plate for a violation detection
+        
+        Returns:
+            str: Vehicle number, or None if the plate could not be read
+        """
+        return self._read_violation_plates([(frame, detection)])[0]
+    
+    def _read_violation_plates(self, items):
+        """
+        Read the number plates for several violation detections in one OCR call
+        
+        Args:
+            items (list): (frame, detection) pairs
+            
+        Returns:
+            list: Vehicle number, or None if the plate could not be read, for each item
+        """
+        plate_regions = [self._violation_plate_region(frame, detection) for frame, detection in items]
+        
+        try:
+            # Read number plates
+            plates = self.plate_reader.read_plates_batch(plate_regions)
+        except Exception as e:
+            print(f"Error reading plates: {e}")
+            return [None] * len(items)
+        
+        vehicle_nos = []
+        for plate in plates:
+            if plate == 'UNKNOWN':
+                print(f"    Could not read plate, skipping violation")
+                vehicle_nos.append(None)
+            else:
+                print(f"    Detected vehicle: {plate}")
+                vehicle_nos.append(plate)
+        return vehicle_nos
+    
+    def _violation_plate_region(self, frame, detection):
+        """Crop the plate region for a violation detection, or None on error"""
         try:
             violation_type = detection['type']
-            bbox = detection['bbox']
             confidence = detection['confidence']
             
             print(f"  Processing {violation_type} violation (confidence: {confidence:.2f})")
             
             # Extract plate region
-            plate_region = self.detector.extract_plate_region(frame, bbox)
-            
-            # Read number plate
-            vehicle_no = self.plate_reader.read_plate(plate_region)
-            
-            if vehicle_no == 'UNKNOWN':
-                print(f"    Could not read plate, skipping violation")
-                return None
+            return self.detector.extract_plate_region(frame, detection['bbox'])
             
-            print(f"    Detected vehicle: {vehicle_no}")
+        except Exception as e:
+            print(f"Error processing violation: {e}")
+            return None
+    
+    def _record_violation(self, frame, detection, vehicle_no, frame_number, timestamp, pending_counts=None):
+        """
+        Fine and snapshot a violation whose plate has been read
+        
+        The snapshot is written in the background; pass results to
+        _commit_violations to insert them and start their e-challans.
+        
+        Args:
+            pending_counts (Counter): Recorded but not yet inserted violations
+                per vehicle, so repeat offenses within a batch are fined as such
+        
+        Returns:
+            tuple: (violation data, database row, snapshot write future), or None on error
+        """
+        if pending_counts is None:
+            pending_counts = Counter()
+        try:
+            violation_type = detection['type']
+            bbox = detection['bbox']
+            confidence = detection['confidence']
             
             # Compute fine
-            fine_amount = compute_fine(vehicle_no, violation_type, self.db)
+            fine_amount = compute_fine(vehicle_no, violation_type, self.db, pending_counts[vehicle_no])
+            pending_counts[vehicle_no] += 1
             
             # Save violation snapshot
             snapshot_filename = f"violation_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{frame_number}.jpg"
@@ -124,42 +326,80 @@ class ViolationWorker:
             # Crop and save the violation area
             x1, y1, x2, y2 = [int(coord) for coord in bbox]
             violation_crop = frame[y1:y2, x1:x2]
-            cv2.imwrite(snapshot_path, violation_crop)
+            snapshot_write = self._io_pool.submit(cv2.imwrite, snapshot_path, violation_crop)
             
             # Generate description
             description = self.generate_description(violation_type, vehicle_no, timestamp)
             
-            # Insert violation into database
-            violation_id = self.db.insert_violation(
-                vehicle_no=vehicle_no,
-                violation_type=violation_type,
-                fine_amount=fine_amount,
-                image_path=snapshot_path,
-                description=description
-            )
-            
-            print(f"    Violation logged with ID: {violation_id}")
-            
-            # Generate PDF e-challan
-            pdf_path = build_pdf(violation_id)
-            if pdf_path:
-                print(f"    E-challan generated: {pdf_path}")
+            # Row for DatabaseManager.insert_violations_bulk
+            row = {
+                'vehicle_no': vehicle_no,
+                'violation_type': violation_type,
+                'fine_amount': fine_amount,
+                'image_path': snapshot_path,
+                'description': description
+            }
             
             return {
-                'id': violation_id,
+                'id': None,
                 'vehicle_no': vehicle_no,
                 'violation_type': violation_type,
                 'fine_amount': fine_amount,
                 'snapshot_path': snapshot_path,
-                'pdf_path': pdf_path,
+                'pdf_path': None,
                 'timestamp': timestamp,
                 'confidence': confidence
-            }
+            }, row, snapshot_write
             
         except Exception as e:
             print(f"Error processing violation: {e}")
             return None
     
+    def _commit_violations(self, recorded):
+        """
+        Insert recorded violations in one transaction and start their e-challans
+        
+        Args:
+            recorded (list): Results of _record_violation
+            
+        Returns:
+            list: (violation data, PDF future) pairs; pass each to _finish_pdf
+        """
+        try:
+            # Insert violations into database
+            violation_ids = self.db.insert_violations_bulk([row for _, row, _ in recorded])
+        except Exception as e:
+            print(f"Error logging {len(recorded)} violations: {e}")
+            return []
+        
+        committed = []
+        for (violation, _, snapshot_write), violation_id in zip(recorded, violation_ids):
+            violation['id'] = violation_id
+            print(f"    Violation logged with ID: {violation_id}")
+            
+            # Generate PDF e-challan once the snapshot it embeds is on disk
+            pdf_future = self._pdf_pool.submit(self._build_pdf_after, snapshot_write, violation_id)
+            committed.append((violation, pdf_future))
+        return committed
+    
+    @staticmethod
+    def _build_pdf_after(snapshot_write, violation_id):
+        """Wait for the snapshot write, then build the e-challan PDF"""
+        snapshot_write.result()
+        return build_pdf(violation_id)
+    
+    def _finish_pdf(self, violation, pdf_future):
+        """Wait for a violation's PDF and store its path in the violation data"""
+        try:
+            pdf_path = pdf_future.result()
+        except Exception as e:
+            print(f"Error generating e-challan for violation {violation['id']}: {e}")
+            pdf_path = None
+        if pdf_path:
+            print(f"    E-challan generated: {pdf_path}")
+        violation['pdf_path'] = pdf_path
+        return violation
+    
     def generate_description(self, violation_type, vehicle_no, timestamp):
         """
         Generate description for violation
@@ -173,7 +413,7 @@ class ViolationWorker:
         """
         # Check if OpenAI integration is available
         try:
-            from road_safety_violation_detector.website.gpt_report import generate_description
+            from website.gpt_report import generate_description
             return generate_description({
                 'violation_type': violation_type,
                 'vehicle_no': vehicle_no,
@@ -192,7 +432,7 @@ class ViolationWorker:
     
     def process_sample_video(self):
         """Process the sample video"""
-        return self.process_video(SAMPLE_VIDEO_PATH)
+        return self._process_video(SAMPLE_VIDEO_PATH)
 
 def main():
     """Main function for command line usage"""